@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 from fastapi import FastAPI
@@ -34,3 +35,10 @@ def serve_frontend() -> FileResponse:
 Base.metadata.create_all(bind=engine)
 
 app.include_router(charts_router, prefix="/api")
+
+
+# Per-request SQL/app/serialization timings: Server-Timing header + /metrics (VIZ_METRICS=1).
+# Kept last so the routes above get timed.
+if os.getenv("VIZ_METRICS", "0") == "1":
+    from .instrumentation import install
+    install(app, engine)
@@ -0,0 +1,219 @@
+# backend/app/aggregates.py
+# Derived tables built at ingest from `matches`:
+#   team_year_stats -- one row per (team, year, tournament) with played/wins/draws/losses/gf/ga,
+#                      so the yearly and leaderboard endpoints read small indexed aggregates.
+#   team_matches    -- one row per team per match from that team's perspective (dimension ids),
+#                      so per-team queries are (team_id, date) index range scans.
+#   team_streaks    -- longest/current streaks per team, from team_matches (see form.py).
+import re
+from typing import Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from .models import Team, TeamYearStat, TeamMatch
+from .dimensions import intern_dimensions, refresh_team_stats
+
+_YEAR_START = re.compile(r"^(\d{4})-01-01$")
+_YEAR_END = re.compile(r"^(\d{4})-12-31$")
+_ISO_PREFIX = re.compile(r"^\d{4}(-\d{2}(-\d{2})?)?$")
+
+
+def rebuild_team_year_stats(db: Session, years=None) -> int:
+    """
+    Recompute team_year_stats from matches (inside the caller's transaction).
+    `years`: only rebuild these years (incremental ingest); None rebuilds everything.
+    """
+    where_sql, params = "1=1", {}
+    if years is not None:
+        years = sorted(set(years))
+        if not years:
+            return 0
+        params = {f"y{i}": y for i, y in enumerate(years)}
+        where_sql = "year IN (%s)" % ", ".join(f":y{i}" for i in range(len(years)))
+
+    # No WHERE on a full rebuild so SQLite can use its truncate fast path
+    db.execute(text("DELETE FROM team_year_stats" + (f" WHERE {where_sql}" if years else "")), params)
+    db.execute(text(f"""
+    INSERT INTO team_year_stats (team, year, tournament, played, wins, draws, losses, gf, ga)
+    SELECT team, year, tournament,
+           COUNT(*),
+           SUM(CASE WHEN gf > ga THEN 1 ELSE 0 END),
+           SUM(CASE WHEN gf = ga THEN 1 ELSE 0 END),
+           SUM(CASE WHEN gf < ga THEN 1 ELSE 0 END),
+           SUM(gf),
+           SUM(ga)
+    FROM (
+      -- Home perspective
+      SELECT home_team AS team, year, tournament,
+             home_score AS gf, away_score AS ga
+      FROM matches
+      UNION ALL
+      -- Away perspective
+      SELECT away_team AS team, year, tournament,
+             away_score AS gf, home_score AS ga
+      FROM matches
+    )
+    WHERE {where_sql}
+    GROUP BY team, year, tournament
+    """), params)
+    q = db.query(func.count()).select_from(TeamYearStat)
+    if years is not None:
+        q = q.filter(TeamYearStat.year.in_(years))
+    return q.scalar()
+
+
+def rebuild_team_matches(db: Session, years=None) -> int:
+    """
+    Recompute team_matches from matches (inside the caller's transaction).
+    `years`: only rebuild these years (incremental ingest); None rebuilds everything.
+    """
+    where_sql, params = "1=1", {}
+    if years is not None:
+        years = sorted(set(years))
+        if not years:
+            return 0
+        params = {f"y{i}": y for i, y in enumerate(years)}
+        where_sql = "year IN (%s)" % ", ".join(f":y{i}" for i in range(len(years)))
+
+    db.execute(text("DELETE FROM team_matches" + (f" WHERE {where_sql}" if years else "")), params)
+    for side, other, gf, ga, is_home in (("home_team_id", "away_team_id", "home_score", "away_score", 1),
+                                         ("away_team_id", "home_team_id", "away_score", "home_score", 0)):
+        db.execute(text(f"""
+        INSERT INTO team_matches (match_id, team_id, opponent_id, date, date_key, year, tournament_id,
+                                  is_home, goals_for, goals_against, result)
+        SELECT id, {side}, {other}, date, date_key, year, tournament_id, {is_home}, {gf}, {ga},
+               CASE WHEN {gf} > {ga} THEN 'W' WHEN {gf} = {ga} THEN 'D' ELSE 'L' END
+        FROM matches
+        WHERE {where_sql}
+        """), params)
+    q = db.query(func.count()).select_from(TeamMatch)
+    if years is not None:
+        q = q.filter(TeamMatch.year.in_(years))
+    return q.scalar()
+
+
+def rebuild_derived(db: Session, years=None, teams=None) -> dict:
+    """
+    Intern dimension ids, then rebuild every derived table; returns row counts for logging.
+    Incremental ingest passes the changed `years` and the names of the `teams` whose
+    matches changed: per-year tables are redone for those years, per-team ones
+    (teams' totals, team_streaks) for those teams. No changed years: nothing to do.
+    """
+    if years is not None and not years:
+        return {}
+    counts = {"teams": intern_dimensions(db, years)}
+    counts["team_year_stats"] = rebuild_team_year_stats(db, years)
+    counts["team_matches"] = rebuild_team_matches(db, years)
+    team_ids = None
+    if teams is not None:
+        team_ids = [i for (i,) in db.query(Team.id).filter(Team.name.in_(sorted(set(teams))))]
+    refresh_team_stats(db, team_ids)
+    from .form import rebuild_team_streaks   # form.py queries through this module
+    counts["team_streaks"] = rebuild_team_streaks(db, team_ids)
+    return counts
+
+
+def date_key(iso: str) -> int:
+    """
+    'YYYY-MM-DD' -> YYYYMMDD. Shorter prefixes ('YYYY', 'YYYY-MM') are zero-padded,
+    which orders them exactly as the ISO string compare did.
+    """
+    return int(iso.replace("-", "").ljust(8, "0"))
+
+
+def is_date_prefix(value: str) -> bool:
+    return bool(_ISO_PREFIX.match(value))
+
+
+def filter_dates(q, date_col, key_col, year_col, date_from: Optional[str], date_to: Optional[str]):
+    """
+    date_from/date_to filters on the integer date_key/year columns (index-driven);
+    values that are not ISO date prefixes keep the old string compare on date_col.
+    """
+    if date_from:
+        if is_date_prefix(date_from):
+            q = q.filter(year_col >= int(date_from[:4]), key_col >= date_key(date_from))
+        else:
+            q = q.filter(date_col >= date_from)
+    if date_to:
+        if is_date_prefix(date_to):
+            q = q.filter(year_col <= int(date_to[:4]), key_col <= date_key(date_to))
+        else:
+            q = q.filter(date_col <= date_to)
+    return q
+
+
+def whole_years(date_from: Optional[str], date_to: Optional[str]):
+    """
+    (year_from, year_to) if the date range covers whole calendar years, else None.
+    Either bound may be None (open-ended).
+    """
+    y_from = y_to = None
+    if date_from:
+        m = _YEAR_START.match(date_from)
+        if not m:
+            return None
+        y_from = int(m.group(1))
+    if date_to:
+        m = _YEAR_END.match(date_to)
+        if not m:
+            return None
+        y_to = int(m.group(1))
+    return y_from, y_to
+
+
+def _filter(q, tournament, y_from, y_to):
+    if tournament:
+        q = q.filter(TeamYearStat.tournament == tournament)
+    if y_from is not None:
+        q = q.filter(TeamYearStat.year >= y_from)
+    if y_to is not None:
+        q = q.filter(TeamYearStat.year <= y_to)
+    return q
+
+
+def yearly_rows_query(teams, tournament, y_from, y_to):
+    """Yearly rows for several teams in one GROUP BY team, year (see rows_by_team)."""
+    q = select(
+        TeamYearStat.team.label("team"),
+        TeamYearStat.year.label("year"),
+        func.sum(TeamYearStat.played).label("matches"),
+        func.sum(TeamYearStat.wins).label("wins"),
+        func.sum(TeamYearStat.draws).label("draws"),
+        func.sum(TeamYearStat.losses).label("losses"),
+        func.sum(TeamYearStat.gf).label("gf"),
+        func.sum(TeamYearStat.ga).label("ga"),
+    ).filter(TeamYearStat.team.in_(teams))
+    q = _filter(q, tournament, y_from, y_to)
+    return (q.group_by(TeamYearStat.team, TeamYearStat.year)
+              .order_by(TeamYearStat.team.asc(), TeamYearStat.year.asc()))
+
+
+def rows_by_team(rows, teams, names=None) -> dict:
+    """{team: [row dicts minus "team"]}; `names` maps the team column (ids) to names."""
+    out = {t: [] for t in teams}
+    for r in rows:
+        d = r._asdict()
+        team = d.pop("team")
+        out[names[team] if names is not None else team].append(d)
+    return out
+
+
+def per_team_year_rows(db: Session, tournament, y_from, y_to):
+    """(year, team, wins, draws, losses, gf, ga, played) ordered by year, team -- the leaderboards' input."""
+    q = select(
+        TeamYearStat.year.label("year"),
+        TeamYearStat.team.label("team"),
+        func.sum(TeamYearStat.wins).label("wins"),
+        func.sum(TeamYearStat.draws).label("draws"),
+        func.sum(TeamYearStat.losses).label("losses"),
+        func.sum(TeamYearStat.gf).label("gf"),
+        func.sum(TeamYearStat.ga).label("ga"),
+        func.sum(TeamYearStat.played).label("played"),
+    )
+    q = _filter(q, tournament, y_from, y_to)
+    q = (q.group_by(TeamYearStat.year, TeamYearStat.team)
+          .order_by(TeamYearStat.year.asc(), TeamYearStat.team.asc()))
+    # Plain rows through Core: no ORM Query row processing for ~14k rows
+    return db.execute(q).mappings().all()
@@ -0,0 +1,59 @@
+# backend/app/asgi_client.py
+# In-process GET through an ASGI app (middleware included, no sockets).
+# Used by POST /batch for its sub-queries and by the benchmark's request loop.
+import asyncio
+from typing import NamedTuple
+from urllib.parse import urlencode
+
+
+class AsgiResponse(NamedTuple):
+    status: int
+    content_type: str
+    body: bytes       # b"" when the caller asked not to keep it
+    size: int         # body bytes sent
+
+
+def query_string(params: dict) -> bytes:
+    # Lists repeat the parameter (?teams=A&teams=B); booleans as true/false
+    flat = {k: (str(v).lower() if isinstance(v, bool) else v) for k, v in params.items()}
+    return urlencode(flat, doseq=True).encode()
+
+
+async def asgi_get(app, path: str, params: dict, host: str = "local", keep_body: bool = True) -> AsgiResponse:
+    """One GET through `app`. keep_body=False only counts the bytes (benchmark memory numbers)."""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query_string(params), "root_path": "",
+        "headers": [(b"host", host.encode())],
+        "client": ("127.0.0.1", 0), "server": (host, 80),
+    }
+    status, ctype, chunks, size = None, "", [], 0
+    request_sent = False
+    done = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, ctype, size
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            for k, v in message.get("headers", []):
+                if k.lower() == b"content-type":
+                    ctype = v.decode("latin-1")
+        elif message["type"] == "http.response.body":
+            body = message.get("body", b"")
+            size += len(body)
+            if keep_body:
+                chunks.append(body)
+            if not message.get("more_body", False):
+                done.set()
+
+    await app(scope, receive, send)
+    return AsgiResponse(status, ctype, b"".join(chunks), size)
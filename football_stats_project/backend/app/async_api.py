@@ -0,0 +1,37 @@
+# backend/app/async_api.py
+# /async/* twins of the read endpoints whose cost is SQLite I/O, on the aiosqlite engine
+# (FOOTBALL_ASYNC_DB=1; main.py includes the router only then).
+#
+# The twins live in main.py next to their sync versions and build the same select()
+# statements, but `await db.execute(...)` them: the event loop serves other requests
+# while SQLite works. CPU work stays off the loop -- the in-memory store's aggregations
+# run through anyio.to_thread, and so does (re)loading the team dictionary below.
+#
+# Endpoints that are mostly Python work over many rows (head-to-head matrix, top_by_year,
+# top_cumulative, the leaderboard, the Elo ranking) have no twin: on the loop they would
+# stall every other request, and the threadpool already runs them in parallel.
+import anyio
+from fastapi import APIRouter
+
+from . import dimensions
+from .database import SessionLocal
+
+router = APIRouter(prefix="/async", tags=["async"])
+
+
+def _load_dictionary() -> dimensions.Dictionary:
+    db = SessionLocal()
+    try:
+        dims = dimensions.get_dictionary(db)
+        dims.search_index
+        return dims
+    finally:
+        db.close()
+
+
+async def get_dictionary() -> dimensions.Dictionary:
+    """The team dictionary; loaded on a worker thread when a dataset change has cleared it."""
+    dims = dimensions.loaded_dictionary()
+    if dims is None:
+        dims = await anyio.to_thread.run_sync(_load_dictionary)
+    return dims
@@ -0,0 +1,95 @@
+# backend/app/batch.py
+# POST /batch: several read queries in one round trip.
+#
+#   {"queries": [{"path": "/stats/yearly", "params": {"team": "Brazil"}},
+#                {"path": "/stats/yearly", "params": {"team": "Argentina"}},
+#                {"path": "/stats/opponents", "params": {"team": "Brazil", "top": 5}}]}
+#
+# /stats/yearly sub-queries that share tournament/date filters are merged into one
+# grouped pass (GROUP BY team, year -- the same one /stats/yearly/batch uses).
+# Anything else runs concurrently as an in-process GET through the full app, so
+# validation, the response cache and error responses behave exactly as over HTTP.
+# Results come back in request order: {"results": [{path, status, body}, ...]}.
+import asyncio
+import json
+from typing import Union
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from .asgi_client import asgi_get
+from .cache import ETAG_EXACT, ETAG_PREFIXES
+
+MAX_QUERIES = 50
+MAX_CONCURRENCY = 8     # in-flight sub-requests, so one batch can't take the whole threadpool
+
+# /stats/yearly params that can be merged; anything else sends the query down the generic path
+_YEARLY_FILTERS = ("tournament", "date_from", "date_to")
+
+
+class SubQuery(BaseModel):
+    path: str
+    params: dict[str, Union[str, int, float, bool, list[str]]] = {}
+
+
+class BatchRequest(BaseModel):
+    queries: list[SubQuery]
+
+
+def _readable(path: str) -> bool:
+    # Same set of GET-only, query-string-addressed routes the ETag layer covers
+    return path in ETAG_EXACT or path.startswith(ETAG_PREFIXES)
+
+
+def _yearly_group_key(q: SubQuery):
+    """(tournament, date_from, date_to) if q can join a merged /stats/yearly pass, else None."""
+    if q.path != "/stats/yearly" or not isinstance(q.params.get("team"), str) or not q.params["team"]:
+        return None
+    if set(q.params) - {"team", *_YEARLY_FILTERS}:
+        return None
+    return tuple((q.params.get(k) or None) for k in _YEARLY_FILTERS)
+
+
+async def run_batch(app, queries, yearly_group) -> dict:
+    """
+    Evaluate `queries` against `app`. `yearly_group(teams, tournament, date_from, date_to)`
+    is the sync merged pass for /stats/yearly: returns {team: /stats/yearly response body}.
+    """
+    if not queries or len(queries) > MAX_QUERIES:
+        raise HTTPException(status_code=400, detail=f"give 1-{MAX_QUERIES} queries")
+
+    results = [None] * len(queries)
+    groups = {}   # (tournament, date_from, date_to) -> [query index, ...]
+    generic = []
+    for i, q in enumerate(queries):
+        if not _readable(q.path):
+            results[i] = {"path": q.path, "status": 400,
+                          "body": {"detail": "only GET read endpoints can be batched"}}
+            continue
+        key = _yearly_group_key(q)
+        if key is not None:
+            groups.setdefault(key, []).append(i)
+        else:
+            generic.append(i)
+
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+
+    async def run_group(key, idxs):
+        teams = list(dict.fromkeys(queries[i].params["team"] for i in idxs))
+        async with sem:
+            bodies = await run_in_threadpool(yearly_group, teams, *key)
+        for i in idxs:
+            results[i] = {"path": "/stats/yearly", "status": 200,
+                          "body": bodies[queries[i].params["team"]]}
+
+    async def run_one(i):
+        q = queries[i]
+        async with sem:
+            status, ctype, body, _ = await asgi_get(app, q.path, q.params, host="batch")
+        results[i] = {"path": q.path, "status": status,
+                      "body": json.loads(body) if ctype.startswith("application/json") else body.decode()}
+
+    await asyncio.gather(*(run_group(k, v) for k, v in groups.items()),
+                         *(run_one(i) for i in generic))
+    return {"results": results}
@@ -0,0 +1,366 @@
+# backend/app/benchmark.py
+# Repeatable benchmark for the hot read endpoints (/matches, /stats/yearly,
+# /stats/opponents, /stats/top_by_year, /stats/top_cumulative).
+#
+#   python -m app.benchmark                              # scales 1,10,100 -> JSON on stdout
+#   python -m app.benchmark --scales 1,10 --requests 100 --out before.json
+#   python -m app.benchmark --engine memory --concurrency 8
+#
+# For every scale a database is built from data/results.csv (scale 1) or from a
+# synthetic copy with each fixture repeated N times (same dates/teams/tournaments,
+# scores jittered by a seeded RNG), so per-team and per-year volume grows N-fold.
+# Build and measurement each run in their own subprocess: database.py reads its
+# URL at import time, and peak RSS then covers only the app serving requests.
+#
+# Requests go straight through the ASGI app (middleware included, no sockets).
+# The response cache is off unless --cache is given, so every request does the work.
+import argparse, asyncio, csv, json, os, platform, random, subprocess, sys, tempfile, time, tracemalloc
+
+try:
+    import resource
+except ImportError:  # not available on Windows; peak RSS is then omitted
+    resource = None
+
+from .asgi_client import asgi_get
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+DEFAULT_SCALES = (1, 10, 100)
+
+
+# ---------- datasets ----------
+
+def write_scaled_csv(src: str, dst: str, scale: int, seed: int = 0):
+    """results.csv with every row repeated `scale` times (copy 0 unchanged), still date-ordered."""
+    rng = random.Random(seed)
+    jitter = (-1, 0, 0, 1)
+    with open(src, newline="", encoding="utf-8") as fin, \
+         open(dst, "w", newline="", encoding="utf-8") as fout:
+        reader = csv.DictReader(fin)
+        writer = csv.DictWriter(fout, fieldnames=reader.fieldnames)
+        writer.writeheader()
+        for r in reader:
+            writer.writerow(r)
+            for _ in range(scale - 1):
+                writer.writerow(dict(
+                    r,
+                    home_score=max(0, int(r["home_score"]) + rng.choice(jitter)),
+                    away_score=max(0, int(r["away_score"]) + rng.choice(jitter)),
+                ))
+
+
+def db_path(workdir: str, scale: int) -> str:
+    return os.path.join(workdir, f"football_x{scale}.db")
+
+
+def _build(scale: int, workdir: str) -> dict:
+    """Runs in the build subprocess (FOOTBALL_DATABASE_URL already points into workdir)."""
+    from . import ingest_results
+
+    csv_path = ingest_results.CSV_PATH
+    if scale > 1:
+        csv_path = os.path.join(workdir, f"results_x{scale}.csv")
+        write_scaled_csv(ingest_results.CSV_PATH, csv_path, scale)
+    ingest_results.CSV_PATH = csv_path
+
+    t0 = time.perf_counter()
+    ingest_results.run()
+    return {"build_seconds": round(time.perf_counter() - t0, 3)}
+
+
+# ---------- in-process ASGI app ----------
+
+class Lifespan:
+    """Drive the ASGI lifespan protocol so startup handlers (schema, store) run as under uvicorn."""
+
+    def __init__(self, app):
+        self.app = app
+        self.inbox, self.outbox = asyncio.Queue(), asyncio.Queue()
+
+    async def _call(self, event):
+        await self.inbox.put({"type": f"lifespan.{event}"})
+        message = await self.outbox.get()
+        if message["type"].endswith(".failed"):
+            raise RuntimeError(f"lifespan {event} failed: {message.get('message')}")
+
+    async def __aenter__(self):
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+        self.task = asyncio.create_task(self.app(scope, self.inbox.get, self.outbox.put))
+        await self._call("startup")
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._call("shutdown")
+        await self.task
+
+
+# ---------- parameter mixes ----------
+
+def build_cases(db, popular: int = 3) -> list:
+    """
+    [(name, path, [params, ...])] -- each case's requests cycle through its variants.
+    Teams are the most-played ones in this database; page depths are derived from its size.
+    """
+    from sqlalchemy import func
+    from .models import Match, Team, TeamMatch, Tournament
+    from .main import _encode_cursor
+
+    teams = [t for (t,) in (db.query(Team.name)
+                              .order_by(Team.matches.desc(), Team.name)
+                              .limit(popular))]
+    team_ids = dict(db.query(Team.name, Team.id))
+    tournaments = [t for (t,) in (db.query(Tournament.name)
+                                    .join(Match, Match.tournament_id == Tournament.id)
+                                    .group_by(Tournament.id)
+                                    .order_by(func.count().desc(), Tournament.name)
+                                    .limit(3))]
+    first, last = db.query(func.min(Match.date), func.max(Match.date)).one()
+    y0, y1 = int(first[:4]), int(last[:4])
+    mid = (y0 + y1) // 2
+    # Wide ranges that don't fall on whole years, so pre-aggregated shortcuts can't hide the scan
+    wide = {"date_from": f"{y0 + 10}-03-15", "date_to": f"{y1 - 2}-09-30"}
+    total = db.query(Match).count()
+    size = 50
+
+    def team_total(t):
+        return db.query(TeamMatch).filter(TeamMatch.team_id == team_ids[t]).count()
+
+    def deep_cursor(t, frac=0.9):
+        # Keyset position ~frac through the team's history, as if paged there with next_cursor
+        n = team_total(t)
+        row = (db.query(TeamMatch.date, TeamMatch.match_id)
+                 .filter(TeamMatch.team_id == team_ids[t])
+                 .order_by(TeamMatch.date, TeamMatch.match_id)
+                 .offset(int(n * frac)).first())
+        return _encode_cursor(row.date, row.match_id, n)
+
+    return [
+        ("list_matches.team_first_page", "/matches", [{"team": t} for t in teams]),
+        ("list_matches.team_deep_offset", "/matches",
+         [{"team": t, "page": max(1, int(team_total(t) * 0.9) // size)} for t in teams]),
+        ("list_matches.team_deep_cursor", "/matches",
+         [{"team": t, "cursor": deep_cursor(t)} for t in teams]),
+        ("list_matches.all_deep_offset", "/matches",
+         [{"page": max(1, int(total * 0.9) // 200), "page_size": 200}]),
+        ("list_matches.wide_range", "/matches",
+         [dict(wide, tournament=tr) for tr in tournaments] + [wide]),
+        ("stats_yearly.team", "/stats/yearly", [{"team": t} for t in teams]),
+        ("stats_yearly.team_wide_range", "/stats/yearly",
+         [dict(wide, team=t, tournament=tournaments[0]) for t in teams]),
+        ("stats_opponents.team", "/stats/opponents", [{"team": t} for t in teams]),
+        ("stats_opponents.team_filtered", "/stats/opponents",
+         [dict(wide, team=t, min_matches=3, top=10) for t in teams]),
+        ("top_by_year.all", "/stats/top_by_year", [{"metric": "wins"}, {"metric": "gf"}]),
+        ("top_by_year.wide_range", "/stats/top_by_year",
+         [dict(wide, metric="gf", top=20), dict(wide, tournament=tournaments[0])]),
+        ("top_cumulative.all", "/stats/top_cumulative", [{"metric": "wins"}, {"metric": "gf", "top": 20}]),
+        ("top_cumulative.wide_range", "/stats/top_cumulative",
+         [dict(wide, metric="wins"), {"metric": "gf", "date_from": f"{mid}-01-01"}]),
+        ("top_cumulative.tournament", "/stats/top_cumulative",
+         [{"tournament": tr} for tr in tournaments]),
+    ]
+
+
+# ---------- measurement ----------
+
+def percentile(sorted_values, p):
+    # Nearest-rank percentile
+    if not sorted_values:
+        return None
+    k = max(0, min(len(sorted_values) - 1, -(-len(sorted_values) * p // 100) - 1))
+    return sorted_values[int(k)]
+
+
+async def run_case(app, path, variants, requests, warmup, concurrency, budget):
+    for i in range(warmup):
+        await asgi_get(app, path, variants[i % len(variants)], host="benchmark", keep_body=False)
+
+    latencies, errors, sizes = [], 0, 0
+    counter = iter(range(requests))
+    deadline = time.perf_counter() + budget if budget else None
+
+    async def worker():
+        nonlocal errors, sizes
+        for i in counter:
+            # Always take a few samples, then stop once the time budget is spent
+            if deadline and len(latencies) >= 5 and time.perf_counter() > deadline:
+                return
+            t0 = time.perf_counter_ns()
+            status, _, _, size = await asgi_get(app, path, variants[i % len(variants)],
+                                                host="benchmark", keep_body=False)
+            latencies.append((time.perf_counter_ns() - t0) / 1e6)
+            sizes += size
+            if status != 200:
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - t0
+
+    latencies.sort()
+    n = len(latencies)
+    return {
+        "requests": n,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / n, 3),
+        "max_ms": round(latencies[-1], 3),
+        "throughput_rps": round(n / wall, 2) if wall else None,
+        "avg_response_bytes": sizes // n,
+    }
+
+
+async def peak_alloc_kb(app, path, variants):
+    """Peak Python-heap growth (tracemalloc) while serving each variant once."""
+    tracemalloc.start()
+    try:
+        for params in variants:
+            await asgi_get(app, path, params, host="benchmark", keep_body=False)
+        return round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+    finally:
+        tracemalloc.stop()
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def _measure(args) -> dict:
+    """Runs in the measurement subprocess."""
+    from .database import SessionLocal
+    from .main import app
+    from .models import Match
+
+    async with Lifespan(app):
+        db = SessionLocal()
+        try:
+            matches = db.query(Match).count()
+            cases = build_cases(db)
+        finally:
+            db.close()
+
+        endpoints = {}
+        for name, path, variants in cases:
+            result = await run_case(app, path, variants, args.requests, args.warmup,
+                                    args.concurrency, args.case_budget)
+            result["peak_alloc_kb"] = await peak_alloc_kb(app, path, variants)
+            endpoints[name] = result
+            print(f"  x{args.scale} {name}: p50 {result['p50_ms']}ms p95 {result['p95_ms']}ms",
+                  file=sys.stderr)
+
+    return {"matches": matches, "peak_rss_mb": peak_rss_mb(), "endpoints": endpoints}
+
+
+# ---------- driver ----------
+
+def _subprocess(args, mode, scale, result_path):
+    env = dict(os.environ,
+               FOOTBALL_DATABASE_URL="sqlite:///" + db_path(args.workdir, scale),
+               FOOTBALL_STATS_ENGINE=args.engine,
+               FOOTBALL_CACHE="1" if args.cache else "0")
+    env.pop("FOOTBALL_ASYNC_DB", None)
+    cmd = [sys.executable, "-m", "app.benchmark", mode, "--scale", str(scale),
+           "--result", result_path] + _passthrough(args)
+    # Ingest/startup messages go to stderr so stdout stays clean JSON
+    subprocess.run(cmd, cwd=BACKEND_DIR, env=env, check=True, stdout=sys.stderr)
+    with open(result_path) as f:
+        return json.load(f)
+
+
+def _passthrough(args):
+    return ["--workdir", args.workdir, "--requests", str(args.requests), "--warmup", str(args.warmup),
+            "--concurrency", str(args.concurrency), "--case-budget", str(args.case_budget)]
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> dict:
+    report = {
+        "generated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"engine": args.engine, "cache": args.cache, "requests": args.requests,
+                   "warmup": args.warmup, "concurrency": args.concurrency,
+                   "case_budget_seconds": args.case_budget},
+        "scales": [],
+    }
+    for scale in args.scales:
+        with tempfile.TemporaryDirectory() as tmp:
+            entry = {"scale": scale}
+            path = db_path(args.workdir, scale)
+            if args.reuse and os.path.exists(path):
+                entry["build_seconds"] = None
+            else:
+                for suffix in ("", "-wal", "-shm"):
+                    if os.path.exists(path + suffix):
+                        os.remove(path + suffix)
+                print(f"building x{scale} database...", file=sys.stderr)
+                entry.update(_subprocess(args, "--build", scale, os.path.join(tmp, "build.json")))
+            entry["db_bytes"] = os.path.getsize(path)
+            print(f"measuring x{scale}...", file=sys.stderr)
+            entry.update(_subprocess(args, "--measure", scale, os.path.join(tmp, "measure.json")))
+        report["scales"].append(entry)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the football API read endpoints")
+    parser.add_argument("--scales", default=",".join(map(str, DEFAULT_SCALES)),
+                        help="comma-separated dataset multipliers (default 1,10,100)")
+    parser.add_argument("--requests", type=int, default=50, help="timed requests per case")
+    parser.add_argument("--warmup", type=int, default=3, help="untimed requests per case")
+    parser.add_argument("--concurrency", type=int, default=1, help="in-flight requests per case")
+    parser.add_argument("--case-budget", type=float, default=30.0,
+                        help="seconds per case before stopping early (0 = no limit)")
+    parser.add_argument("--engine", choices=("sql", "memory"), default="sql",
+                        help="FOOTBALL_STATS_ENGINE for the app under test")
+    parser.add_argument("--cache", action="store_true", help="leave the response cache on")
+    parser.add_argument("--workdir", default=None,
+                        help="where databases are built (default: a temporary directory)")
+    parser.add_argument("--reuse", action="store_true",
+                        help="reuse databases already in --workdir instead of rebuilding")
+    parser.add_argument("--out", help="write the JSON report here instead of stdout")
+    # internal: one build / measurement per subprocess
+    parser.add_argument("--build", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--measure", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--scale", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.build or args.measure:
+        result = _build(args.scale, args.workdir) if args.build else asyncio.run(_measure(args))
+        with open(args.result, "w") as f:
+            json.dump(result, f)
+        return
+
+    args.scales = [int(s) for s in args.scales.split(",") if s.strip()]
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.workdir is None:
+            args.workdir = tmp
+        args.workdir = os.path.abspath(args.workdir)
+        os.makedirs(args.workdir, exist_ok=True)
+        report = run(args)
+
+    out = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(out + "\n")
+    else:
+        print(out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+# backend/app/cache.py
+# Response cache for the read-only endpoints (/stats/*, /meta/tournaments, /meta/teams, /matches/count).
+#
+# Those endpoints are pure functions of their query parameters and the contents of
+# `matches`, which only changes when ingest_results runs. Each ingest bumps the
+# `dataset_version` row in ingest_state; it is part of every cache key, so entries
+# from an older dataset simply stop matching and age out of the LRU.
+#
+# Env knobs:
+#   FOOTBALL_CACHE=0                    disable caching
+#   FOOTBALL_CACHE_MAX_ENTRIES=512      LRU entry budget
+#   FOOTBALL_CACHE_MAX_BYTES=67108864   approximate JSON-size budget
+#   FOOTBALL_CACHE_TTL=300              seconds an entry may be served
+#   FOOTBALL_VERSION_CHECK=1.0          seconds between dataset_version polls
+#   FOOTBALL_HTTP_MAX_AGE=0             Cache-Control max-age sent with ETagged responses
+import asyncio
+import contextvars
+import functools
+import hashlib
+import inspect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import anyio
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; entries are sized with stdlib json instead
+    orjson = None
+
+from .database import SessionLocal
+from .ingest_results import STATE_VERSION
+from .models import IngestState
+
+CACHE_ENABLED = os.getenv("FOOTBALL_CACHE", "1") != "0"
+MAX_ENTRIES = int(os.getenv("FOOTBALL_CACHE_MAX_ENTRIES", "512"))
+MAX_BYTES = int(os.getenv("FOOTBALL_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+TTL_SECONDS = float(os.getenv("FOOTBALL_CACHE_TTL", "300"))
+VERSION_CHECK_SECONDS = float(os.getenv("FOOTBALL_VERSION_CHECK", "1.0"))
+HTTP_MAX_AGE = int(os.getenv("FOOTBALL_HTTP_MAX_AGE", "0"))
+
+# GET routes whose body depends only on the query string + dataset version
+ETAG_PREFIXES = ("/stats/", "/meta/tournaments", "/meta/teams", "/matches/count",
+                 "/async/stats/", "/async/meta/tournaments", "/async/meta/teams", "/async/matches/count")
+ETAG_EXACT = ("/matches", "/async/matches")
+
+# Dependency arguments that are not part of the request identity
+_UNKEYED = {"db", "store"}
+
+# Set while a request is being profiled so the endpoint really runs (see profiler.py)
+bypass = contextvars.ContextVar("cache_bypass", default=False)
+
+
+def _json_size(value) -> int:
+    """An entry's size for the byte budget: the length of its compact JSON."""
+    if orjson is not None:
+        return len(orjson.dumps(value, default=str,
+                                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY))
+    return len(json.dumps(value, separators=(",", ":"), default=str))
+
+
+class ResponseCache:
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, ttl=TTL_SECONDS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data = OrderedDict()   # key -> (expires_at, size, value)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, value):
+        size = _json_size(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.monotonic() + self.ttl, size, value)
+            self._bytes += size
+            while len(self._data) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        _, size, _ = self._data.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": CACHE_ENABLED,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+                "dataset_version": _version,
+            }
+
+
+response_cache = ResponseCache()
+
+# ---------- dataset version ----------
+# Reading the version is a SQLite query, and a change runs the listeners (store and
+# dictionary reloads), so neither may happen on the event loop. While the server runs,
+# poll_dataset_version() refreshes it on a worker thread every VERSION_CHECK_SECONDS
+# and requests only read the cached value. The new version is published after the
+# listeners finish, so until then requests keep being served from the old dataset.
+
+_version = None
+_checked_at = 0.0
+_polling = False
+_version_lock = threading.Lock()
+_listeners = []
+
+
+def on_dataset_change(fn):
+    """Register a callback run (once per change) when a new dataset_version is seen."""
+    _listeners.append(fn)
+    return fn
+
+
+def refresh_version() -> str:
+    """Re-read dataset_version from ingest_state and handle a change. Blocking: not on the loop."""
+    global _version, _checked_at
+    with _version_lock:
+        db = SessionLocal()
+        try:
+            row = db.get(IngestState, STATE_VERSION)
+            new = row.value if row else "0"
+        finally:
+            db.close()
+        changed = _version is not None and new != _version
+        if changed:
+            for fn in _listeners:
+                fn()
+        _version, _checked_at = new, time.monotonic()
+        if changed:
+            response_cache.clear()
+        return _version
+
+
+def _needs_refresh() -> bool:
+    # With the poller running, requests only read the first version in themselves
+    if _version is None:
+        return True
+    return not _polling and time.monotonic() - _checked_at >= VERSION_CHECK_SECONDS
+
+
+def dataset_version() -> str:
+    """Current ingest generation, for sync code (endpoints run on the threadpool)."""
+    return refresh_version() if _needs_refresh() else _version
+
+
+async def current_version() -> str:
+    """dataset_version() for code on the event loop: a refresh runs on a worker thread."""
+    return await anyio.to_thread.run_sync(refresh_version) if _needs_refresh() else _version
+
+
+async def poll_dataset_version():
+    """Startup task: refresh the version off the loop every VERSION_CHECK_SECONDS."""
+    global _polling
+    _polling = True
+    try:
+        while True:
+            try:
+                await anyio.to_thread.run_sync(refresh_version)
+            except Exception as exc:   # keep polling; the next round retries
+                print("dataset_version refresh failed:", repr(exc))
+            await asyncio.sleep(VERSION_CHECK_SECONDS)
+    finally:
+        _polling = False
+
+
+def cache_key(name: str, params: dict) -> tuple:
+    # Normalized: defaults already applied by FastAPI, empty values dropped, order-independent
+    items = tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in params.items()
+                         if k not in _UNKEYED and v is not None and v != ""))
+    return (name, items, dataset_version())
+
+
+def cached(fn):
+    """Cache an endpoint's return value keyed by its query parameters + dataset version."""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(**kwargs):
+            if not CACHE_ENABLED or bypass.get():
+                return await fn(**kwargs)
+            key = cache_key(fn.__name__, kwargs)
+            value = response_cache.get(key)
+            if value is None:
+                value = await fn(**kwargs)
+                response_cache.set(key, value)
+            return value
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(**kwargs):
+        if not CACHE_ENABLED or bypass.get():
+            return fn(**kwargs)
+        key = cache_key(fn.__name__, kwargs)
+        value = response_cache.get(key)
+        if value is None:
+            value = fn(**kwargs)
+            response_cache.set(key, value)
+        return value
+    return wrapper
+
+
+# ---------- conditional GET ----------
+
+def etag_for(path: str, query_items, version: str) -> str:
+    """Strong ETag: dataset generation + path + normalized (sorted, non-empty) query params."""
+    items = sorted((k, v) for k, v in query_items if v != "")
+    raw = json.dumps([version, path, items], separators=(",", ":"))
+    return '"%s"' % hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison: ignore W/ prefixes
+    tags = (t.strip() for t in if_none_match.split(","))
+    return any((t[2:] if t.startswith("W/") else t) == etag for t in tags)
+
+
+async def conditional_get(request, call_next):
+    """HTTP middleware: answer If-None-Match with 304 before the endpoint (and its DB work) runs."""
+    path = request.url.path
+    if request.method != "GET" or not (path in ETAG_EXACT or path.startswith(ETAG_PREFIXES)):
+        return await call_next(request)
+
+    etag = etag_for(path, request.query_params.multi_items(), await current_version())
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={HTTP_MAX_AGE}, must-revalidate",
+    }
+    inm = request.headers.get("if-none-match")
+    if inm and _etag_matches(inm, etag):
+        return Response(status_code=304, headers=headers)
+
+    response = await call_next(request)
+    if response.status_code == 200:
+        response.headers.update(headers)
+    return response
@@ -0,0 +1,198 @@
+# backend/app/coalesce.py
+# Request coalescing and per-endpoint concurrency limits.
+#
+#   single-flight  concurrent GETs to a read endpoint with the same path, normalized
+#                  query string and dataset version share one downstream call. Followers
+#                  wait on the event loop (not on a threadpool thread) and are sent a copy
+#                  of the leader's response, so a burst of identical requests costs one
+#                  aggregation.
+#   limits         at most N requests in flight per expensive endpoint; the rest wait in a
+#                  FIFO queue, and get 503 + Retry-After once the queue is full or the wait
+#                  times out. A burst of leaderboards can then no longer take every worker
+#                  thread away from cheap calls like /matches/count.
+#
+# Both run inside the ETag layer, so 304s never reach them. /async/* twins share the
+# limit of their sync route.
+#
+# Env knobs:
+#   FOOTBALL_COALESCE=0                     disable single-flight
+#   FOOTBALL_CONCURRENCY_LIMITS=path=N,...  replaces DEFAULT_LIMITS ("" = no limits)
+#   FOOTBALL_QUEUE_MAX=100                  waiting requests per limited endpoint
+#   FOOTBALL_QUEUE_TIMEOUT=30               seconds a request may wait for a slot
+import asyncio
+import json
+import os
+from collections import deque
+from urllib.parse import parse_qsl
+
+from .cache import ETAG_EXACT, ETAG_PREFIXES, bypass, current_version
+
+COALESCE_ENABLED = os.getenv("FOOTBALL_COALESCE", "1") != "0"
+QUEUE_MAX = int(os.getenv("FOOTBALL_QUEUE_MAX", "100"))
+QUEUE_TIMEOUT = float(os.getenv("FOOTBALL_QUEUE_TIMEOUT", "30"))
+
+# Full-table aggregations; everything else is an indexed lookup and runs unlimited
+DEFAULT_LIMITS = {
+    "/stats/leaderboard": 4,
+    "/stats/top_by_year": 4,
+    "/stats/top_cumulative": 4,
+    "/stats/head_to_head": 4,
+    "/stats/yearly/batch": 4,
+    "/matches/export": 2,
+}
+
+
+def _parse_limits(raw):
+    if raw is None:
+        return dict(DEFAULT_LIMITS)
+    limits = {}
+    for part in raw.split(","):
+        path, _, n = part.strip().partition("=")
+        if path and n:
+            limits[path] = int(n)
+    return limits
+
+
+LIMITS = _parse_limits(os.getenv("FOOTBALL_CONCURRENCY_LIMITS"))
+
+
+class Overloaded(Exception):
+    pass
+
+
+class EndpointLimit:
+    """FIFO semaphore that hands a freed slot straight to the oldest waiter."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self.queue = deque()
+        self.rejected = 0
+
+    async def acquire(self):
+        if self.active < self.limit and not self.queue:
+            self.active += 1
+            return
+        if len(self.queue) >= QUEUE_MAX:
+            self.rejected += 1
+            raise Overloaded
+        waiter = asyncio.get_running_loop().create_future()
+        self.queue.append(waiter)
+        try:
+            # release() passes its slot on by resolving the future; active is unchanged
+            await asyncio.wait_for(waiter, QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise Overloaded
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()   # the slot was handed over just as this request went away
+            raise
+        finally:
+            if waiter in self.queue:
+                self.queue.remove(waiter)
+
+    def release(self):
+        while self.queue:
+            waiter = self.queue.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self) -> dict:
+        return {"limit": self.limit, "active": self.active,
+                "queued": len(self.queue), "rejected": self.rejected}
+
+
+def _copy(message):
+    # Outer layers (compression, ETag) edit the start message's header list in place
+    return dict(message, headers=list(message["headers"])) if "headers" in message else message
+
+
+class CoalescingMiddleware:
+    def __init__(self, app, limits=None, coalesce: bool = COALESCE_ENABLED):
+        self.app = app
+        self.limits = {p: EndpointLimit(n) for p, n in (LIMITS if limits is None else limits).items()}
+        self.coalesce = coalesce
+        self.inflight = {}    # key -> future of the leader's response messages (None: failed)
+        self.leaders = 0
+        self.coalesced = 0
+        _instances.append(self)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        path = scope["path"]
+        if not (self.coalesce and scope["method"] == "GET" and not bypass.get()
+                and (path in ETAG_EXACT or path.startswith(ETAG_PREFIXES))):
+            return await self._limited(scope, receive, send)
+
+        query = sorted((k, v) for k, v in parse_qsl(scope["query_string"].decode("latin-1"))
+                       if v != "")
+        key = (path, tuple(query), await current_version())
+        pending = self.inflight.get(key)
+        if pending is not None:
+            messages = await asyncio.shield(pending)
+            if messages is not None:
+                self.coalesced += 1
+                for message in messages:
+                    await send(_copy(message))
+                return
+            # The leader failed: compute this one on its own
+            return await self._limited(scope, receive, send)
+
+        pending = self.inflight[key] = asyncio.get_running_loop().create_future()
+        self.leaders += 1
+        messages = []
+
+        async def send_copy(message):
+            messages.append(_copy(message))
+            await send(message)
+
+        complete = False
+        try:
+            await self._limited(scope, receive, send_copy)
+            complete = bool(messages) and not messages[-1].get("more_body", False)
+        finally:
+            del self.inflight[key]
+            pending.set_result(messages if complete else None)
+
+    async def _limited(self, scope, receive, send):
+        path = scope["path"]
+        limit = self.limits.get(path[len("/async"):] if path.startswith("/async/") else path)
+        if limit is None:
+            return await self.app(scope, receive, send)
+        try:
+            await limit.acquire()
+        except Overloaded:
+            body = json.dumps({"detail": "server busy, retry shortly"}).encode()
+            await send({"type": "http.response.start", "status": 503,
+                        "headers": [(b"content-type", b"application/json"),
+                                    (b"content-length", str(len(body)).encode()),
+                                    (b"retry-after", b"1")]})
+            await send({"type": "http.response.body", "body": body})
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limit.release()
+
+    def stats(self) -> dict:
+        return {
+            "coalesce": self.coalesce,
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "in_flight": len(self.inflight),
+            "queue_max": QUEUE_MAX,
+            "queue_timeout_seconds": QUEUE_TIMEOUT,
+            "limits": {p: l.stats() for p, l in self.limits.items()},
+        }
+
+
+# Middleware instances are built lazily by Starlette; /meta/concurrency reads the live one
+_instances = []
+
+
+def stats() -> dict:
+    return _instances[-1].stats() if _instances else {}
@@ -0,0 +1,258 @@
+# backend/app/columnar.py
+# Optional in-memory engine for the /stats endpoints.
+#
+# SQLite stays the source of truth: on startup we read every Match row once
+# and keep it as NumPy column arrays (team/tournament names dictionary-encoded
+# to small ints, ISO dates as fixed-width bytes, scores as int16). The stats endpoints
+# then answer with vectorized masks + bincount group-bys instead of SQL.
+#
+# Enable with FOOTBALL_STATS_ENGINE=memory (default "sql").
+import os
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from .models import Match
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional; endpoints fall back to SQL
+    np = None
+
+STATS_ENGINE = os.getenv("FOOTBALL_STATS_ENGINE", "sql").lower()
+
+
+class MatchStore:
+    def __init__(self, rows):
+        # rows: iterable of (id, date, home_team, away_team, home_score, away_score, tournament)
+        # already ordered by (date, id) so date filters become a contiguous slice.
+        rows = list(rows)
+        n = len(rows)
+
+        # Sorted dictionaries => id order == name order (same as SQLite's BINARY collation)
+        self.teams = sorted({r[2] for r in rows} | {r[3] for r in rows})
+        self.team_ids = {t: i for i, t in enumerate(self.teams)}
+        self.tournaments = sorted({r[6] for r in rows})
+        self.tournament_ids = {t: i for i, t in enumerate(self.tournaments)}
+
+        self.id = np.fromiter((r[0] for r in rows), dtype=np.int64, count=n)
+        # ISO strings kept as bytes so date_from/date_to keep their string-compare semantics
+        self.date_str = np.array([r[1].encode("ascii") for r in rows], dtype="S10")
+        self.year = np.fromiter((int(r[1][:4]) for r in rows), dtype=np.int16, count=n)
+        self.home = np.fromiter((self.team_ids[r[2]] for r in rows), dtype=np.int32, count=n)
+        self.away = np.fromiter((self.team_ids[r[3]] for r in rows), dtype=np.int32, count=n)
+        self.home_score = np.fromiter((r[4] for r in rows), dtype=np.int16, count=n)
+        self.away_score = np.fromiter((r[5] for r in rows), dtype=np.int16, count=n)
+        self.tournament = np.fromiter((self.tournament_ids[r[6]] for r in rows), dtype=np.int32, count=n)
+
+    def __len__(self):
+        return len(self.id)
+
+    @classmethod
+    def load(cls, db: Session) -> "MatchStore":
+        rows = (
+            db.query(Match.id, Match.date, Match.home_team, Match.away_team,
+                     Match.home_score, Match.away_score, Match.tournament)
+              .order_by(Match.date.asc(), Match.id.asc())
+              .all()
+        )
+        return cls(rows)
+
+    # ---------- filtering ----------
+
+    def _slice(self, date_from: Optional[str], date_to: Optional[str]) -> slice:
+        lo, hi = 0, len(self)
+        if date_from:
+            lo = int(np.searchsorted(self.date_str, date_from.encode(), side="left"))
+        if date_to:
+            hi = int(np.searchsorted(self.date_str, date_to.encode(), side="right"))
+        return slice(lo, max(lo, hi))
+
+    def _select(self, tournament, date_from, date_to, team_id=None):
+        """Row indices matching the shared filters (and optionally involving team_id)."""
+        sl = self._slice(date_from, date_to)
+        mask = np.ones(sl.stop - sl.start, dtype=bool)
+        if tournament:
+            tid = self.tournament_ids.get(tournament)
+            if tid is None:
+                return np.empty(0, dtype=np.int64)
+            mask &= self.tournament[sl] == tid
+        if team_id is not None:
+            mask &= (self.home[sl] == team_id) | (self.away[sl] == team_id)
+        return np.flatnonzero(mask) + sl.start
+
+    def _team_perspective(self, idx, team_id):
+        """Goals for/against from team_id's point of view for the selected rows."""
+        is_home = self.home[idx] == team_id
+        hs = self.home_score[idx].astype(np.int64)
+        aw = self.away_score[idx].astype(np.int64)
+        gf = np.where(is_home, hs, aw)
+        ga = np.where(is_home, aw, hs)
+        return is_home, gf, ga
+
+    # ---------- endpoint queries ----------
+
+    def yearly_many(self, teams, tournament=None, date_from=None, date_to=None):
+        """{team: yearly rows} for several teams from one pass over the selected matches."""
+        out = {t: [] for t in teams}
+        ids = sorted({self.team_ids[t] for t in teams if t in self.team_ids})
+        if not ids:
+            return out
+        idx = self._select(tournament, date_from, date_to)
+        if not len(idx):
+            return out
+
+        # slot[team id] = position in `ids`, -1 for teams not asked for
+        slot = np.full(len(self.teams), -1, dtype=np.int64)
+        slot[ids] = np.arange(len(ids))
+        home, away = slot[self.home[idx]], slot[self.away[idx]]
+        h, a = home >= 0, away >= 0
+        hs = self.home_score[idx].astype(np.int64)
+        aw = self.away_score[idx].astype(np.int64)
+        # Both perspectives; a match between two requested teams counts for each
+        team = np.concatenate([home[h], away[a]])
+        year = np.concatenate([self.year[idx][h], self.year[idx][a]]).astype(np.int64)
+        gf = np.concatenate([hs[h], aw[a]])
+        ga = np.concatenate([aw[h], hs[a]])
+        if not len(team):
+            return out
+
+        y0 = int(year.min())
+        span = int(year.max()) - y0 + 1
+        key = team * span + (year - y0)
+        size = len(ids) * span
+        played = np.bincount(key, minlength=size)
+        wins = np.bincount(key, weights=gf > ga, minlength=size)
+        draws = np.bincount(key, weights=gf == ga, minlength=size)
+        losses = np.bincount(key, weights=gf < ga, minlength=size)
+        sum_gf = np.bincount(key, weights=gf, minlength=size)
+        sum_ga = np.bincount(key, weights=ga, minlength=size)
+
+        for k in np.flatnonzero(played):   # ascending key == (team, year) order
+            t, y = divmod(int(k), span)
+            out[self.teams[ids[t]]].append(
+                {"year": y0 + y, "matches": int(played[k]),
+                 "wins": int(wins[k]), "draws": int(draws[k]), "losses": int(losses[k]),
+                 "gf": int(sum_gf[k]), "ga": int(sum_ga[k])})
+        return out
+
+    def opponents(self, team, tournament=None, date_from=None, date_to=None,
+                  min_matches=1, top=25):
+        team_id = self.team_ids.get(team)
+        if team_id is None:
+            return []
+        idx = self._select(tournament, date_from, date_to, team_id)
+        if not len(idx):
+            return []
+        is_home, gf, ga = self._team_perspective(idx, team_id)
+        opp = np.where(is_home, self.away[idx], self.home[idx])
+
+        n = len(self.teams)
+        played = np.bincount(opp, minlength=n)
+        wins = np.bincount(opp, weights=gf > ga, minlength=n)
+        draws = np.bincount(opp, weights=gf == ga, minlength=n)
+        losses = np.bincount(opp, weights=gf < ga, minlength=n)
+        sum_gf = np.bincount(opp, weights=gf, minlength=n)
+        sum_ga = np.bincount(opp, weights=ga, minlength=n)
+
+        keep = np.flatnonzero(played >= min_matches)
+        # ORDER BY played DESC, opponent ASC (ids are alphabetical)
+        order = keep[np.lexsort((keep, -played[keep]))][:top]
+
+        return [
+            {"opponent": self.teams[o], "played": int(played[o]),
+             "wins": int(wins[o]), "draws": int(draws[o]), "losses": int(losses[o]),
+             "gf": int(sum_gf[o]), "ga": int(sum_ga[o])}
+            for o in order
+        ]
+
+    def head_to_head(self, teams=None, tournament=None, date_from=None, date_to=None):
+        """
+        (teams, {metric: flat N*N list}) over matches between two teams of the set, row-major,
+        row = that team's perspective. teams=None: every team with a match under the filters.
+        """
+        idx = self._select(tournament, date_from, date_to)
+        if teams is None:
+            teams = [self.teams[i] for i in np.union1d(self.home[idx], self.away[idx])]
+        n = len(teams)
+        slot = np.full(len(self.teams), -1, dtype=np.int64)
+        for k, t in enumerate(teams):
+            if t in self.team_ids:
+                slot[self.team_ids[t]] = k
+        home, away = slot[self.home[idx]], slot[self.away[idx]]
+        both = (home >= 0) & (away >= 0)
+        home, away = home[both], away[both]
+        hs = self.home_score[idx][both].astype(np.int64)
+        aw = self.away_score[idx][both].astype(np.int64)
+
+        # Each match once from each side
+        key = np.concatenate([home * n + away, away * n + home])
+        gf = np.concatenate([hs, aw])
+        ga = np.concatenate([aw, hs])
+        size = n * n
+        cells = {
+            "played": np.bincount(key, minlength=size),
+            "wins": np.bincount(key, weights=gf > ga, minlength=size),
+            "draws": np.bincount(key, weights=gf == ga, minlength=size),
+            "losses": np.bincount(key, weights=gf < ga, minlength=size),
+            "gf": np.bincount(key, weights=gf, minlength=size),
+            "ga": np.bincount(key, weights=ga, minlength=size),
+        }
+        return teams, {m: a.astype(np.int64).tolist() for m, a in cells.items()}
+
+    def per_team_year(self, tournament=None, date_from=None, date_to=None):
+        """
+        Same rows as the per_team_year/agg SQL: (year, team, wins, draws, losses, gf, ga, played),
+        ordered by year, team.
+        """
+        idx = self._select(tournament, date_from, date_to)
+        if not len(idx):
+            return []
+        hs = self.home_score[idx]
+        aw = self.away_score[idx]
+        year = np.concatenate([self.year[idx], self.year[idx]]).astype(np.int64)
+        team = np.concatenate([self.home[idx], self.away[idx]]).astype(np.int64)
+        gf = np.concatenate([hs, aw])
+        ga = np.concatenate([aw, hs])
+
+        y0 = int(year.min())
+        n = len(self.teams)
+        key = (year - y0) * n + team
+        size = int(key.max()) + 1
+        played = np.bincount(key, minlength=size)
+        wins = np.bincount(key, weights=gf > ga, minlength=size)
+        draws = np.bincount(key, weights=gf == ga, minlength=size)
+        losses = np.bincount(key, weights=gf < ga, minlength=size)
+        goals_for = np.bincount(key, weights=gf, minlength=size)
+        goals_against = np.bincount(key, weights=ga, minlength=size)
+
+        out = []
+        for k in np.flatnonzero(played):   # ascending key == (year, team) order
+            y, t = divmod(int(k), n)
+            out.append({"year": y0 + y, "team": self.teams[t],
+                        "wins": int(wins[k]), "draws": int(draws[k]), "losses": int(losses[k]),
+                        "gf": int(goals_for[k]), "ga": int(goals_against[k]), "played": int(played[k])})
+        return out
+
+
+_store: Optional[MatchStore] = None
+
+
+def load_store(db: Session) -> Optional[MatchStore]:
+    """Build the in-memory store if FOOTBALL_STATS_ENGINE=memory (and numpy is available)."""
+    global _store
+    if STATS_ENGINE != "memory":
+        _store = None
+        return None
+    if np is None:
+        print("FOOTBALL_STATS_ENGINE=memory but numpy is not installed; using SQL.")
+        _store = None
+        return None
+    _store = MatchStore.load(db)
+    print("In-memory stats engine loaded:", len(_store), "matches")
+    return _store
+
+
+# FastAPI dependency: the loaded store, or None when the SQL engine should be used.
+def get_store() -> Optional[MatchStore]:
+    return _store
@@ -1,11 +1,83 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 
+# Engine settings come from env so each process (API workers, ingest) can be tuned:
+#   FOOTBALL_DATABASE_URL        default: SQLite file relative to backend/; any SQLAlchemy URL works
+#   FOOTBALL_DB_POOL_SIZE        pooled connections kept open (default 5)
+#   FOOTBALL_DB_MAX_OVERFLOW     extra connections allowed under burst (default 10)
+#   FOOTBALL_DB_POOL_TIMEOUT     seconds to wait for a free connection (default 30)
+#   FOOTBALL_DB_POOL_RECYCLE     recycle connections older than N seconds (default -1: never)
+# SQLite only, applied to every pooled connection:
+#   FOOTBALL_SQLITE_JOURNAL_MODE WAL (default) lets readers run alongside the ingest writer
+#   FOOTBALL_SQLITE_SYNCHRONOUS  NORMAL (default; safe with WAL)
+#   FOOTBALL_SQLITE_MMAP_SIZE    bytes of the file memory-mapped (default 256 MiB)
+#   FOOTBALL_SQLITE_CACHE_SIZE   page cache, negative = KiB (default -65536 = 64 MiB)
+#   FOOTBALL_SQLITE_TEMP_STORE   MEMORY (default)
+#   FOOTBALL_SQLITE_BUSY_TIMEOUT seconds to wait on a locked database (default 5)
+#   FOOTBALL_SQLITE_READONLY=1   open read-only (API processes; skips startup writes)
+#   FOOTBALL_SQLITE_IMMUTABLE=1  also promise the file never changes (no locking at all)
+
 # SQLite file relative to the folder you run uvicorn from (backend/)
-DATABASE_URL = "sqlite:///./data/football.db"
+DATABASE_URL = os.getenv("FOOTBALL_DATABASE_URL", "sqlite:///./data/football.db")
+
+POOL_SIZE = int(os.getenv("FOOTBALL_DB_POOL_SIZE", "5"))
+MAX_OVERFLOW = int(os.getenv("FOOTBALL_DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT = float(os.getenv("FOOTBALL_DB_POOL_TIMEOUT", "30"))
+POOL_RECYCLE = int(os.getenv("FOOTBALL_DB_POOL_RECYCLE", "-1"))
+
+SQLITE_PRAGMAS = {
+    "journal_mode": os.getenv("FOOTBALL_SQLITE_JOURNAL_MODE", "WAL"),
+    "synchronous": os.getenv("FOOTBALL_SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": os.getenv("FOOTBALL_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)),
+    "cache_size": os.getenv("FOOTBALL_SQLITE_CACHE_SIZE", "-65536"),
+    "temp_store": os.getenv("FOOTBALL_SQLITE_TEMP_STORE", "MEMORY"),
+}
+SQLITE_BUSY_TIMEOUT = float(os.getenv("FOOTBALL_SQLITE_BUSY_TIMEOUT", "5"))
+IMMUTABLE = os.getenv("FOOTBALL_SQLITE_IMMUTABLE", "0") == "1"
+READ_ONLY = IMMUTABLE or os.getenv("FOOTBALL_SQLITE_READONLY", "0") == "1"
+
+IS_SQLITE = make_url(DATABASE_URL).get_backend_name() == "sqlite"
+
+
+def _sqlite_url(url: str, read_only: bool, immutable: bool) -> str:
+    """Rewrite a sqlite:///path URL as a read-only (optionally immutable) URI filename."""
+    if not read_only:
+        return url
+    # pysqlite passes the extra query args through to SQLite's URI parser
+    query = "mode=ro" + ("&immutable=1" if immutable else "")
+    return f"{make_url(url).drivername}:///file:{make_url(url).database}?{query}&uri=true"
+
+
+def apply_sqlite_pragmas(dbapi_conn, read_only: bool = READ_ONLY):
+    cur = dbapi_conn.cursor()
+    for name, value in SQLITE_PRAGMAS.items():
+        # journal_mode is a property of the file; a read-only connection can't change it
+        if name == "journal_mode" and read_only:
+            continue
+        cur.execute(f"PRAGMA {name}={value}")
+    cur.close()
+
+
+def _engine_kwargs() -> dict:
+    kw = dict(pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW,
+              pool_timeout=POOL_TIMEOUT, pool_recycle=POOL_RECYCLE)
+    if IS_SQLITE:
+        # check_same_thread=False is needed for SQLite with FastAPI's threaded workers
+        kw["connect_args"] = {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT}
+    return kw
 
-# check_same_thread=False is needed for SQLite with FastAPI's threaded workers
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+engine = create_engine(
+    _sqlite_url(DATABASE_URL, READ_ONLY, IMMUTABLE) if IS_SQLITE else DATABASE_URL,
+    **_engine_kwargs(),
+)
+
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        apply_sqlite_pragmas(dbapi_conn)
 
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 Base = declarative_base()
@@ -17,3 +89,44 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# ---------- optional async engine (SQLAlchemy asyncio + aiosqlite) ----------
+# Enabled with FOOTBALL_ASYNC_DB=1; serves the /async/* twins of the I/O-bound read endpoints.
+ASYNC_DATABASE_URL = os.getenv(
+    "FOOTBALL_ASYNC_DATABASE_URL",
+    DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1) if IS_SQLITE else DATABASE_URL,
+)
+ASYNC_POOL_SIZE = int(os.getenv("FOOTBALL_ASYNC_POOL_SIZE", "10"))
+ASYNC_MAX_OVERFLOW = int(os.getenv("FOOTBALL_ASYNC_MAX_OVERFLOW", "20"))
+ASYNC_POOL_TIMEOUT = float(os.getenv("FOOTBALL_ASYNC_POOL_TIMEOUT", "30"))   # wait for a pooled connection
+ASYNC_DB_TIMEOUT = float(os.getenv("FOOTBALL_ASYNC_DB_TIMEOUT", "5"))        # SQLite busy timeout
+
+async_engine = None
+AsyncSessionLocal = None
+
+if os.getenv("FOOTBALL_ASYNC_DB", "0") == "1":
+    try:
+        import aiosqlite  # noqa: F401  (driver for sqlite+aiosqlite)
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    except ImportError:
+        print("FOOTBALL_ASYNC_DB=1 but aiosqlite is not installed; async endpoints disabled.")
+    else:
+        async_is_sqlite = make_url(ASYNC_DATABASE_URL).get_backend_name() == "sqlite"
+        async_engine = create_async_engine(
+            _sqlite_url(ASYNC_DATABASE_URL, READ_ONLY, IMMUTABLE) if async_is_sqlite else ASYNC_DATABASE_URL,
+            pool_size=ASYNC_POOL_SIZE,
+            max_overflow=ASYNC_MAX_OVERFLOW,
+            pool_timeout=ASYNC_POOL_TIMEOUT,
+            pool_recycle=POOL_RECYCLE,
+            connect_args={"timeout": ASYNC_DB_TIMEOUT} if async_is_sqlite else {},
+        )
+        if async_is_sqlite:
+            event.listen(async_engine.sync_engine, "connect",
+                         lambda dbapi_conn, _record: apply_sqlite_pragmas(dbapi_conn))
+        AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+# FastAPI dependency: async counterpart of get_db.
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,153 @@
+# backend/app/dimensions.py
+# Dimension tables with small integer keys, assigned at ingest:
+#   teams        -- every home/away team name, plus matches played and first/last match date
+#   tournaments  -- tournament names
+#   venues       -- (city, country) pairs
+#
+# matches and team_matches carry the ids. The API turns request names into ids once,
+# through the in-memory Dictionary, and maps ids back to names for the response.
+# Names are only ever appended, so an id never changes meaning across ingests.
+import functools
+import threading
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .models import Team, Tournament
+from .team_search import TeamSearchIndex
+
+UNKNOWN = -1   # id of a name not in the dictionary; matches no row
+
+
+def intern_dimensions(db: Session, years=None) -> int:
+    """
+    Add unseen names to the dimension tables and fill the id columns of `matches`
+    (inside the caller's transaction). `years`: only re-map these years; None = all rows.
+    Returns the number of teams.
+    """
+    where_sql, params = "1=1", {}
+    if years is not None:
+        years = sorted(set(years))
+        if not years:
+            return db.query(Team).count()
+        params = {f"y{i}": y for i, y in enumerate(years)}
+        where_sql = "year IN (%s)" % ", ".join(f":y{i}" for i in range(len(years)))
+
+    # New names can only come from the rows being (re)mapped
+    db.execute(text(f"""
+    INSERT INTO teams (name)
+    SELECT name FROM (SELECT home_team AS name FROM matches WHERE {where_sql}
+                      UNION SELECT away_team FROM matches WHERE {where_sql})
+    WHERE name NOT IN (SELECT name FROM teams)
+    ORDER BY name
+    """), params)
+    db.execute(text(f"""
+    INSERT INTO tournaments (name)
+    SELECT DISTINCT tournament FROM matches
+    WHERE {where_sql} AND tournament NOT IN (SELECT name FROM tournaments)
+    ORDER BY tournament
+    """), params)
+    db.execute(text(f"""
+    INSERT INTO venues (city, country)
+    SELECT DISTINCT COALESCE(city, ''), COALESCE(country, '') FROM matches m
+    WHERE {where_sql} AND NOT EXISTS (SELECT 1 FROM venues v
+                      WHERE v.city = COALESCE(m.city, '') AND v.country = COALESCE(m.country, ''))
+    ORDER BY 2, 1
+    """), params)
+
+    # Correlated lookups on the dimensions' unique indexes
+    db.execute(text(f"""
+    UPDATE matches SET
+      home_team_id  = (SELECT id FROM teams WHERE name = matches.home_team),
+      away_team_id  = (SELECT id FROM teams WHERE name = matches.away_team),
+      tournament_id = (SELECT id FROM tournaments WHERE name = matches.tournament),
+      venue_id      = (SELECT id FROM venues WHERE city = COALESCE(matches.city, '')
+                                              AND country = COALESCE(matches.country, ''))
+    WHERE {where_sql}
+    """), params)
+    return db.query(Team).count()
+
+
+def refresh_team_stats(db: Session, team_ids=None):
+    """
+    Matches played and first/last match date per team, from one GROUP BY over team_matches.
+    `team_ids`: only these teams (incremental ingest); None refreshes every team.
+    """
+    ids_sql, params = "", {}
+    if team_ids is not None:
+        team_ids = sorted(set(team_ids))
+        if not team_ids:
+            return
+        params = {f"t{i}": t for i, t in enumerate(team_ids)}
+        ids_sql = ", ".join(f":t{i}" for i in range(len(team_ids)))
+    stats = db.execute(text(f"""
+    SELECT team_id, COUNT(*), MIN(date), MAX(date) FROM team_matches
+    {f"WHERE team_id IN ({ids_sql})" if ids_sql else ""}
+    GROUP BY team_id
+    """), params).all()
+    db.execute(text(f"""
+    UPDATE teams SET matches = 0, first_match = NULL, last_match = NULL
+    {f"WHERE id IN ({ids_sql})" if ids_sql else ""}
+    """), params)
+    if stats:
+        db.execute(text("""
+        UPDATE teams SET matches = :matches, first_match = :first, last_match = :last WHERE id = :id
+        """), [{"id": i, "matches": n, "first": first, "last": last} for i, n, first, last in stats])
+
+
+# ---------- API boundary ----------
+
+class Dictionary:
+    """Name <-> id maps for the teams and tournaments dimensions."""
+
+    def __init__(self, db: Session):
+        self.teams = []        # [{id, name, matches, first_match, last_match}], by name
+        self.team_info = {}    # name -> the same dicts
+        self.team_ids = {}
+        self.team_names = {}
+        for t in db.query(Team).order_by(Team.name.asc()):
+            info = {"id": t.id, "name": t.name, "matches": t.matches,
+                    "first_match": t.first_match, "last_match": t.last_match}
+            self.teams.append(info)
+            self.team_info[t.name] = info
+            self.team_ids[t.name] = t.id
+            self.team_names[t.id] = t.name
+        # Date of the earliest match in the dataset (None while it is empty)
+        self.first_match = min((t["first_match"] for t in self.teams if t["first_match"]), default=None)
+        self.tournament_ids = {name: i for i, name in db.query(Tournament.id, Tournament.name)}
+        self.tournament_names = {i: name for name, i in self.tournament_ids.items()}
+
+    @functools.cached_property
+    def search_index(self) -> TeamSearchIndex:
+        return TeamSearchIndex(self.teams)
+
+    def team_id(self, name: Optional[str]) -> int:
+        return self.team_ids.get(name, UNKNOWN)
+
+    def tournament_id(self, name: Optional[str]) -> int:
+        return self.tournament_ids.get(name, UNKNOWN)
+
+
+_dictionary: Optional[Dictionary] = None
+_lock = threading.Lock()
+
+
+def get_dictionary(db: Session) -> Dictionary:
+    """The process-wide Dictionary, loaded on first use after each dataset change."""
+    global _dictionary
+    if _dictionary is None:
+        with _lock:
+            if _dictionary is None:
+                _dictionary = Dictionary(db)
+    return _dictionary
+
+
+def loaded_dictionary() -> Optional[Dictionary]:
+    """The Dictionary if it is already loaded, else None (callers that must not block on the load)."""
+    return _dictionary
+
+
+def clear_dictionary():
+    global _dictionary
+    _dictionary = None
@@ -0,0 +1,185 @@
+# backend/app/form.py
+# Form, rolling averages and streaks per team, over team_matches in (date, match_id) order.
+#
+#   team_streaks  -- built at ingest in one ordered pass over team_matches: for every team
+#                    and streak kind, the longest run ever and the one still going, so
+#                    the all-time and current streak leaderboards are an indexed read
+#   rolling()     -- SQL window functions (AVG / SUM ... OVER ROWS n PRECEDING) over one
+#                    team's matches; the window always sees the matches before date_from
+#   last_matches()-- the team's last N matches, read backwards on its (team_id, date) index
+#
+# The read functions are split into X_query() (a select() statement) and X_items() (rows
+# -> response items), so the /async twins (async_api.py) run the very same statements.
+import itertools
+import re
+from typing import Optional
+
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+from . import aggregates
+from .dimensions import Dictionary, get_dictionary
+from .models import Team, TeamMatch, TeamStreak
+
+CHUNK = 10000
+
+# A team's matches, in order, become one character each in three strings:
+#   result     W / D / L
+#   scored     1 if it scored, else 0
+#   conceded   1 if it conceded, else 0
+# and a streak is a run of the kind's pattern, found by the regex engine instead of a
+# Python loop per match. kind -> (string, pattern)
+STREAK_KINDS = {
+    "winning": ("result", re.compile("W+")),
+    "unbeaten": ("result", re.compile("[WD]+")),
+    "losing": ("result", re.compile("L+")),
+    "winless": ("result", re.compile("[DL]+")),
+    "scoring": ("scored", re.compile("1+")),
+    "clean_sheets": ("conceded", re.compile("0+")),
+}
+
+POINTS = {"W": 3, "D": 1, "L": 0}
+
+
+def _runs(pattern, text, dates):
+    """(longest, start_date, end_date, current) for the runs of `pattern` in one team's string."""
+    runs = list(pattern.finditer(text))
+    if not runs:
+        return 0, None, None, 0
+    best = max(runs, key=lambda m: m.end() - m.start())   # the first of the longest
+    last = runs[-1]
+    current = last.end() - last.start() if last.end() == len(text) else 0
+    return best.end() - best.start(), dates[best.start()], dates[best.end() - 1], current
+
+
+def rebuild_team_streaks(db: Session, team_ids=None) -> int:
+    """
+    Recompute team_streaks from team_matches (inside the caller's transaction).
+    `team_ids`: only these teams (incremental ingest); None rebuilds everything.
+    """
+    delete = TeamStreak.__table__.delete()
+    q = (db.query(TeamMatch.team_id, TeamMatch.date, TeamMatch.result,
+                  TeamMatch.goals_for, TeamMatch.goals_against)
+           .order_by(TeamMatch.team_id, TeamMatch.date, TeamMatch.match_id))
+    if team_ids is not None:
+        team_ids = sorted(set(team_ids))
+        if not team_ids:
+            return 0
+        delete = delete.where(TeamStreak.team_id.in_(team_ids))
+        q = q.filter(TeamMatch.team_id.in_(team_ids))
+    db.execute(delete)
+
+    out = []
+    for team_id, matches in itertools.groupby(q.yield_per(CHUNK), key=lambda r: r[0]):
+        _, dates, results, gf, ga = zip(*matches)
+        texts = {"result": "".join(results),
+                 "scored": "".join(["1" if g else "0" for g in gf]),
+                 "conceded": "".join(["1" if g else "0" for g in ga])}
+        for kind, (column, pattern) in STREAK_KINDS.items():
+            longest, start, end, current = _runs(pattern, texts[column], dates)
+            out.append({"team_id": team_id, "kind": kind, "longest": longest,
+                        "start_date": start, "end_date": end, "current": current})
+    if out:
+        db.execute(TeamStreak.__table__.insert(), out)
+    return len(out)
+
+
+def streak_leaders_query(kind: str, by: str, top: int, min_length: int = 1):
+    """Teams by their longest (by='longest') or ongoing (by='current') run of `kind`."""
+    if by == "longest":
+        length, ties = TeamStreak.longest, TeamStreak.start_date.asc()   # first to get there
+    else:
+        # A current run ends on the team's latest match: the most recently extended first
+        length, ties = TeamStreak.current, Team.last_match.desc()
+    return (select(Team.name, TeamStreak.longest, TeamStreak.start_date,
+                   TeamStreak.end_date, TeamStreak.current)
+              .join(Team, Team.id == TeamStreak.team_id)
+              .filter(TeamStreak.kind == kind, length >= min_length)
+              .order_by(length.desc(), ties, Team.name.asc())
+              .limit(top))
+
+
+def streak_leaders_items(rows):
+    return [{"team": r.name, "longest": r.longest, "start_date": r.start_date,
+             "end_date": r.end_date, "current": r.current} for r in rows]
+
+
+def streak_leaders(db: Session, kind: str, by: str, top: int, min_length: int = 1):
+    return streak_leaders_items(db.execute(streak_leaders_query(kind, by, top, min_length)))
+
+
+def team_streaks_query(dims: Dictionary, team: str):
+    return (select(TeamStreak.kind, TeamStreak.longest, TeamStreak.start_date,
+                   TeamStreak.end_date, TeamStreak.current)
+              .filter(TeamStreak.team_id == dims.team_id(team)))
+
+
+def team_streaks_items(rows) -> dict:
+    """{kind: {longest, start_date, end_date, current}} for one team."""
+    by_kind = {r.kind: {"longest": r.longest, "start_date": r.start_date,
+                        "end_date": r.end_date, "current": r.current} for r in rows}
+    return {kind: by_kind[kind] for kind in STREAK_KINDS if kind in by_kind}
+
+
+def team_streaks(db: Session, team: str) -> dict:
+    return team_streaks_items(db.execute(team_streaks_query(get_dictionary(db), team)))
+
+
+def last_matches_query(dims: Dictionary, team: str, n: int, as_of: Optional[str]):
+    """The team's last n matches up to as_of, newest first (see last_matches_items)."""
+    q = (select(TeamMatch.date, TeamMatch.opponent_id, TeamMatch.tournament_id, TeamMatch.is_home,
+                TeamMatch.goals_for, TeamMatch.goals_against, TeamMatch.result)
+           .filter(TeamMatch.team_id == dims.team_id(team)))
+    q = aggregates.filter_dates(q, TeamMatch.date, TeamMatch.date_key, TeamMatch.year, None, as_of)
+    return q.order_by(TeamMatch.date.desc(), TeamMatch.match_id.desc()).limit(n)
+
+
+def last_matches_items(dims: Dictionary, rows):
+    """last_matches_query rows, oldest first."""
+    return [{"date": r.date, "opponent": dims.team_names[r.opponent_id],
+             "tournament": dims.tournament_names[r.tournament_id], "home": bool(r.is_home),
+             "gf": r.goals_for, "ga": r.goals_against, "result": r.result}
+            for r in reversed(rows)]
+
+
+def last_matches(db: Session, team: str, n: int, as_of: Optional[str]):
+    dims = get_dictionary(db)
+    return last_matches_items(dims, db.execute(last_matches_query(dims, team, n, as_of)).all())
+
+
+def rolling_query(dims: Dictionary, team: str, window: int, tournament: Optional[str],
+                  date_from: Optional[str], date_to: Optional[str]):
+    """Per match: rolling goals for/against averages and points over the last `window` matches."""
+    order = (TeamMatch.date, TeamMatch.match_id)
+    frame = (-(window - 1), 0)
+    points = case((TeamMatch.result == "W", 3), (TeamMatch.result == "D", 1), else_=0)
+    inner = (select(
+                TeamMatch.match_id, TeamMatch.date, TeamMatch.date_key, TeamMatch.year,
+                TeamMatch.opponent_id, TeamMatch.goals_for, TeamMatch.goals_against, TeamMatch.result,
+                func.count().over(order_by=order, rows=frame).label("n"),
+                func.avg(TeamMatch.goals_for).over(order_by=order, rows=frame).label("gf_avg"),
+                func.avg(TeamMatch.goals_against).over(order_by=order, rows=frame).label("ga_avg"),
+                func.sum(points).over(order_by=order, rows=frame).label("points"),
+             )
+             .filter(TeamMatch.team_id == dims.team_id(team)))
+    if tournament:
+        inner = inner.filter(TeamMatch.tournament_id == dims.tournament_id(tournament))
+    w = inner.subquery()
+
+    # Date filters apply after the window so the first rows still average over earlier matches
+    q = aggregates.filter_dates(select(w), w.c.date, w.c.date_key, w.c.year, date_from, date_to)
+    return q.order_by(w.c.date.asc(), w.c.match_id.asc())
+
+
+def rolling_items(dims: Dictionary, rows):
+    return [{"date": r.date, "opponent": dims.team_names[r.opponent_id],
+             "gf": r.goals_for, "ga": r.goals_against, "result": r.result, "window": r.n,
+             "gf_avg": round(r.gf_avg, 3), "ga_avg": round(r.ga_avg, 3),
+             "ppg": round(r.points / r.n, 3)}
+            for r in rows]
+
+
+def rolling(db: Session, team: str, window: int, tournament: Optional[str],
+            date_from: Optional[str], date_to: Optional[str]):
+    dims = get_dictionary(db)
+    return rolling_items(dims, db.execute(rolling_query(dims, team, window, tournament, date_from, date_to)))
@@ -1,49 +1,256 @@
 # backend/app/ingest_results.py
-import os, csv
+#   python -m app.ingest_results                 # full reload (fast bulk path, single transaction)
+#   python -m app.ingest_results --incremental   # upsert only new/changed rows
+import os, csv, io, time, hashlib, argparse, itertools
+from collections import defaultdict
 from sqlalchemy.orm import Session
-from .database import SessionLocal, engine, Base
-from .models import Match
+from .database import SessionLocal, engine, IS_SQLITE, SQLITE_PRAGMAS
+from .models import Match, IngestState, TeamYearStat, TeamMatch, TeamRating, TeamStreak
+from .aggregates import rebuild_derived, date_key
+from .ratings import update_ratings
+from .schema import backfill_derived, migrate_schema
 
 # Resolve ../data/results.csv relative to this file
 CSV_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "results.csv"))
 
+# ingest_state keys for the results.csv high-water mark
+STATE_OFFSET = "results_csv_offset"   # byte offset just past the last ingested line
+STATE_SHA1 = "results_csv_sha1"       # sha1 of results.csv[:offset]
+STATE_VERSION = "dataset_version"     # bumped on every change; API caches key on it
+
+# Column order for the fast loader's INSERT tuples
+INSERT_COLUMNS = ("date", "date_key", "year", "home_team", "away_team", "home_score", "away_score",
+                  "tournament", "city", "country", "neutral")
+
+# Columns compared to decide whether an existing match changed
+VALUE_COLUMNS = ("home_score", "away_score", "city", "country", "neutral")
+
 def to_bool(v) -> bool:
     return str(v).strip().lower() in ("1", "true", "t", "yes", "y")
 
-def run():
-    # Make sure tables exist
-    Base.metadata.create_all(bind=engine)
+def row_values(r) -> dict:
+    return dict(
+        date=r["date"],
+        date_key=date_key(r["date"]),
+        year=int(r["date"][:4]),
+        home_team=r["home_team"],
+        away_team=r["away_team"],
+        home_score=int(r["home_score"]),
+        away_score=int(r["away_score"]),
+        tournament=r["tournament"],
+        city=(r.get("city") or None),
+        country=(r.get("country") or None),
+        neutral=to_bool(r.get("neutral", "false")),
+    )
+
+def natural_key(v) -> tuple:
+    # Not unique on its own (a few same-day replays exist), so rows are matched
+    # by (key, occurrence number) in file order.
+    return (v["date"], v["home_team"], v["away_team"], v["tournament"])
+
+def _get_state(db: Session, key: str):
+    s = db.get(IngestState, key)
+    return s.value if s else None
+
+def _set_state(db: Session, key: str, value):
+    db.merge(IngestState(key=key, value=str(value)))
+
+def _bump_version(db: Session):
+    _set_state(db, STATE_VERSION, int(_get_state(db, STATE_VERSION) or 0) + 1)
+
+def _read_csv(offset: int = 0):
+    """
+    Parse results.csv starting at byte `offset` (0 = whole file).
+    Only complete lines are consumed; returns (rows, end_offset, sha1 of data[:end_offset]).
+    """
+    with open(CSV_PATH, "rb") as f:
+        data = f.read()
+    header_end = data.index(b"\n") + 1
+    header = next(csv.reader([data[:header_end].decode("utf-8")]))
+    start = max(offset, header_end)
+    end = max(data.rfind(b"\n") + 1, start)   # a half-written last line waits for the next run
+    reader = csv.DictReader(io.StringIO(data[start:end].decode("utf-8"), newline=""), fieldnames=header)
+    rows = [row_values(r) for r in reader]
+    return rows, end, hashlib.sha1(data[:end]).hexdigest()
+
+def _mark_is_valid(offset: int, sha1: str) -> bool:
+    # The high-water mark only holds if everything before it is byte-for-byte unchanged
+    with open(CSV_PATH, "rb") as f:
+        prefix = f.read(offset)
+    return len(prefix) == offset and hashlib.sha1(prefix).hexdigest() == sha1
+
+def _parse_chunks(text, chunk_size):
+    # Plain tuples in INSERT_COLUMNS order -- no per-row ORM objects or dicts
+    reader = csv.reader(io.StringIO(text, newline=""))
+    idx = {c: i for i, c in enumerate(next(reader))}
+    d, ht, at, hs, as_, t = (idx[c] for c in ("date", "home_team", "away_team",
+                                                "home_score", "away_score", "tournament"))
+    ci, co, ne = idx.get("city"), idx.get("country"), idx.get("neutral")
+    while True:
+        chunk = [
+            (r[d], date_key(r[d]), int(r[d][:4]), r[ht], r[at], int(r[hs]), int(r[as_]), r[t],
+             (r[ci] or None) if ci is not None else None,
+             (r[co] or None) if co is not None else None,
+             int(to_bool(r[ne])) if ne is not None else 0)
+            for r in itertools.islice(reader, chunk_size)
+        ]
+        if not chunk:
+            return
+        yield chunk
+
+def fast_load(chunk_size: int = 10000):
+    """
+    Full reload via Core executemany of plain tuples, in one transaction.
+    Secondary indexes are dropped for the load and rebuilt afterwards; on SQLite
+    the connection runs with synchronous=OFF while loading (database stays in WAL).
+    Prints the time of each phase: the raw load into matches, the derived-table rebuild,
+    the ratings replay and the index builds.
+    """
+    t0 = time.perf_counter()
+    phases, mark_t = {}, t0
+
+    def phase(name):
+        nonlocal mark_t
+        now = time.perf_counter()
+        phases[name] = now - mark_t
+        mark_t = now
+    with open(CSV_PATH, "rb") as f:
+        data = f.read()
+    end = data.rfind(b"\n") + 1
+    text = data[:end].decode("utf-8")
+
+    # Secondary indexes on matches and the derived tables are built once, after the load
+    indexes = [ix for t in (Match, TeamYearStat, TeamMatch, TeamRating, TeamStreak) for ix in t.__table__.indexes]
+    mark = "?" if engine.dialect.paramstyle == "qmark" else "%s"
+    insert_sql = "INSERT INTO matches (%s) VALUES (%s)" % (
+        ", ".join(INSERT_COLUMNS), ", ".join([mark] * len(INSERT_COLUMNS)))
+
+    with engine.connect() as conn:
+        # WAL / cache / temp_store pragmas come from database.py on connect;
+        # only durability is relaxed for the duration of the load
+        if IS_SQLITE:
+            conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        conn.commit()   # close the autobegun block so the load gets its own transaction
+        try:
+            with conn.begin():
+                # DELETE first so the index drops below run inside the same transaction
+                conn.exec_driver_sql("DELETE FROM matches")
+                for ix in indexes:
+                    conn.exec_driver_sql(f"DROP INDEX IF EXISTS {ix.name}")
+
+                n = 0
+                for chunk in _parse_chunks(text, chunk_size):
+                    conn.exec_driver_sql(insert_sql, chunk)
+                    n += len(chunk)
+                phase("load")
 
+                db = Session(bind=conn)
+                derived = rebuild_derived(db)
+                phase("derived")
+                derived["team_ratings"] = update_ratings(db)
+                phase("ratings")
+
+                for ix in indexes:
+                    ix.create(conn)
+                phase("indexes")
+                _set_state(db, STATE_OFFSET, end)
+                _set_state(db, STATE_SHA1, hashlib.sha1(data[:end]).hexdigest())
+                _bump_version(db)
+                db.flush()
+                db.close()
+        finally:
+            if IS_SQLITE:
+                conn.exec_driver_sql(f"PRAGMA synchronous={SQLITE_PRAGMAS['synchronous']}")
+
+    phase("commit")
+    elapsed = time.perf_counter() - t0
+    print(f"Ingest complete. Rows in matches: {n} |",
+          " | ".join(f"{t}: {c}" for t, c in derived.items()),
+          f"| {elapsed:.2f}s ({n / elapsed:,.0f} rows/sec)")
+    print("Phases:", ", ".join(f"{name} {secs:.2f}s" for name, secs in phases.items()))
+
+def _incremental(db: Session):
+    offset, sha1 = _get_state(db, STATE_OFFSET), _get_state(db, STATE_SHA1)
+    tail = offset is not None and sha1 is not None and _mark_is_valid(int(offset), sha1)
+
+    rows, end, new_sha1 = _read_csv(int(offset) if tail else 0)
+    inserts, updates, deletes, years = [], [], [], set()
+    deleted_dates, deleted_teams = set(), set()
+
+    if tail:
+        # Everything after the mark is new
+        inserts = rows
+    else:
+        # Mark missing or file rewritten: diff the whole file against the table
+        existing = defaultdict(list)
+        cols = [Match.id, Match.date, Match.home_team, Match.away_team, Match.tournament] + \
+               [getattr(Match, c) for c in VALUE_COLUMNS]
+        for m in db.query(*cols).order_by(Match.id.asc()):
+            existing[(m.date, m.home_team, m.away_team, m.tournament)].append(m)
+
+        seen = defaultdict(int)
+        for v in rows:
+            k = natural_key(v)
+            n = seen[k]; seen[k] += 1
+            if n < len(existing[k]):
+                old = existing[k][n]
+                if any(getattr(old, c) != v[c] for c in VALUE_COLUMNS):
+                    updates.append(dict(v, id=old.id))
+            else:
+                inserts.append(v)
+        for k, olds in existing.items():
+            deletes.extend(m.id for m in olds[seen.get(k, 0):])
+            if len(olds) > seen.get(k, 0):
+                years.add(int(k[0][:4]))
+                deleted_dates.add(k[0])
+                deleted_teams.update(k[1:3])
+
+    years.update(v["year"] for v in inserts + updates)
+
+    if inserts:
+        db.bulk_insert_mappings(Match, inserts)
+    if updates:
+        db.bulk_update_mappings(Match, updates)
+    for i in range(0, len(deletes), 500):
+        db.query(Match).filter(Match.id.in_(deletes[i:i + 500])).delete(synchronize_session=False)
+
+    teams = deleted_teams | {v[c] for v in inserts + updates for c in ("home_team", "away_team")}
+    rebuild_derived(db, years, teams)
+    # Ratings depend on every earlier match: replay from the first changed date on
+    changed_dates = deleted_dates | {v["date"] for v in inserts + updates}
+    if changed_dates:
+        update_ratings(db, min(changed_dates))
+    _set_state(db, STATE_OFFSET, end)
+    _set_state(db, STATE_SHA1, new_sha1)
+    if inserts or updates or deletes:
+        _bump_version(db)
+    db.commit()
+    print(f"Incremental ingest ({'tail' if tail else 'full diff'}):",
+          f"{len(inserts)} inserted, {len(updates)} updated, {len(deletes)} deleted",
+          "| rows in matches:", db.query(Match).count())
+
+def run(incremental: bool = False):
     db: Session = SessionLocal()
     try:
-        # Re-runnable: clear existing rows so we don't duplicate
-        db.query(Match).delete()
-        db.commit()
-
-        batch, batch_size = [], 2000
-        with open(CSV_PATH, newline="", encoding="utf-8") as f:
-            reader = csv.DictReader(f)
-            for i, r in enumerate(reader, start=1):
-                batch.append(Match(
-                    date=r["date"],
-                    home_team=r["home_team"],
-                    away_team=r["away_team"],
-                    home_score=int(r["home_score"]),
-                    away_score=int(r["away_score"]),
-                    tournament=r["tournament"],
-                    city=(r.get("city") or None),
-                    country=(r.get("country") or None),
-                    neutral=to_bool(r.get("neutral", "false")),
-                ))
-                if len(batch) >= batch_size:
-                    db.bulk_save_objects(batch); db.commit(); batch.clear()
-
-        if batch:
-            db.bulk_save_objects(batch); db.commit()
-
-        print("Ingest complete. Rows in matches:", db.query(Match).count())
+        # Create missing tables and bring a database from an older release up to date
+        migrate_schema(db)
+    finally:
+        db.close()
+
+    if not incremental:
+        fast_load()
+        return
+
+    db = SessionLocal()
+    try:
+        # The diff below only re-derives changed years: fill ids/tables the old release lacked
+        backfill_derived(db)
+        _incremental(db)
     finally:
         db.close()
 
 if __name__ == "__main__":
-    run()
+    parser = argparse.ArgumentParser(description="Load data/results.csv into the matches table")
+    parser.add_argument("--incremental", action="store_true",
+                        help="upsert only new/changed rows, reading just the tail when possible")
+    run(incremental=parser.parse_args().incremental)
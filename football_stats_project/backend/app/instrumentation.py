@@ -0,0 +1,275 @@
+# backend/app/instrumentation.py
+# Opt-in per-request instrumentation: where does a slow request spend its time?
+#
+# For every request we track
+#   db        SQL statements, their total time and rows fetched (SQLAlchemy engine events)
+#   app       time inside the endpoint function, minus the SQL time
+#   serialize endpoint return -> response start (jsonable_encoder + JSON render)
+#   total     request start -> response start
+# and report it two ways:
+#   Server-Timing response header (shown in the browser devtools' Timing tab)
+#   GET /metrics in Prometheus text format: per-route latency histograms + totals
+#
+# install(app, engine, ...) once, after every route has been registered.
+# The same module as example_visualization/backend/app/instrumentation.py; keep the two in step.
+import contextvars
+import functools
+import inspect
+import threading
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.responses import Response
+from starlette.routing import Match
+from sqlalchemy import event
+
+# Latency histogram buckets (seconds)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestStats:
+    __slots__ = ("start", "sql_count", "sql_seconds", "rows", "endpoint_seconds", "endpoint_end")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+        self.rows = 0
+        self.endpoint_seconds = 0.0
+        self.endpoint_end = None
+
+
+# The current request's stats; a mutable object so threadpool endpoints (which get
+# a copy of the context) still update the same instance.
+_current = contextvars.ContextVar("request_stats", default=None)
+
+
+# ---------- SQL ----------
+
+class _CountingCursor:
+    """DB-API cursor proxy that counts the rows fetched through it."""
+
+    def __init__(self, cursor, stats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._stats.rows += 1
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._stats.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._stats.rows += len(rows)
+        return rows
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._stats.rows += 1
+            yield row
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("instrumentation_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    starts = conn.info.get("instrumentation_start")
+    if stats is None or not starts:
+        return
+    stats.sql_seconds += time.perf_counter() - starts.pop()
+    stats.sql_count += 1
+    # Result rows are fetched after this event, through context.cursor
+    if context is not None and cursor.description is not None:
+        context.cursor = _CountingCursor(cursor, stats)
+
+
+def instrument_engine(engine):
+    """Attach the SQL listeners to a sync Engine (or an AsyncEngine's sync_engine)."""
+    engine = getattr(engine, "sync_engine", engine)
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ---------- endpoint timing ----------
+
+def _timed(fn):
+    """Wrap an endpoint so its own run time (and when it returned) lands in the request stats."""
+    def record(t0):
+        stats = _current.get()
+        if stats is not None:
+            stats.endpoint_end = time.perf_counter()
+            stats.endpoint_seconds += stats.endpoint_end - t0
+
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                record(t0)
+    else:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(t0)
+    return wrapper
+
+
+# ---------- metrics registry ----------
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}   # (method, route, status) -> [bucket counts..., sum, count]
+        self._totals = {}   # route -> {sql_statements, sql_seconds, rows, app_seconds, serialize_seconds}
+
+    def observe(self, method, route, status, seconds, stats, serialize_seconds):
+        with self._lock:
+            h = self._routes.get((method, route, status))
+            if h is None:
+                h = self._routes[(method, route, status)] = [0] * len(BUCKETS) + [0.0, 0]
+            for i, le in enumerate(BUCKETS):
+                if seconds <= le:
+                    h[i] += 1
+            h[-2] += seconds
+            h[-1] += 1
+
+            t = self._totals.get(route)
+            if t is None:
+                t = self._totals[route] = dict.fromkeys(
+                    ("sql_statements", "sql_seconds", "rows", "app_seconds", "serialize_seconds"), 0)
+            t["sql_statements"] += stats.sql_count
+            t["sql_seconds"] += stats.sql_seconds
+            t["rows"] += stats.rows
+            t["app_seconds"] += max(0.0, stats.endpoint_seconds - stats.sql_seconds)
+            t["serialize_seconds"] += serialize_seconds
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)."""
+        with self._lock:
+            routes = {k: list(v) for k, v in self._routes.items()}
+            totals = {k: dict(v) for k, v in self._totals.items()}
+
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by route (until the body is sent).",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route, status), h in sorted(routes.items()):
+            labels = f'method="{method}",route="{_escape(route)}",status="{status}"'
+            for le, n in zip(BUCKETS, h):
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{le}"}} {n}')
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {h[-1]}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {h[-2]:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {h[-1]}")
+
+        for name, key, help_ in (
+            ("db_statements_total", "sql_statements", "SQL statements executed"),
+            ("db_seconds_total", "sql_seconds", "Time spent executing SQL"),
+            ("db_rows_fetched_total", "rows", "Rows fetched from SQL results"),
+            ("app_seconds_total", "app_seconds", "Endpoint time outside SQL"),
+            ("serialize_seconds_total", "serialize_seconds", "Response serialization time"),
+        ):
+            lines.append(f"# HELP http_request_{name} {help_}, by route.")
+            lines.append(f"# TYPE http_request_{name} counter")
+            for route, t in sorted(totals.items()):
+                value = t[key] if isinstance(t[key], int) else f"{t[key]:.6f}"
+                lines.append(f'http_request_{name}{{route="{_escape(route)}"}} {value}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = Metrics()
+
+
+# ---------- ASGI middleware ----------
+
+def _route_label(app, scope, request_scope) -> str:
+    # Route templates, not raw paths, keep the label set small
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    # Mounts, or answered before routing (e.g. a 304 from middleware): match it ourselves
+    for r in app.router.routes:
+        if r.matches(request_scope)[0] == Match.FULL:
+            return r.path
+    return "unmatched"
+
+
+def server_timing(stats, total_seconds, serialize_seconds) -> str:
+    ms = lambda s: f"{s * 1000:.2f}"
+    parts = [f'db;dur={ms(stats.sql_seconds)};desc="{stats.sql_count} queries, {stats.rows} rows"']
+    if stats.endpoint_end is not None:
+        parts.append(f"app;dur={ms(max(0.0, stats.endpoint_seconds - stats.sql_seconds))}")
+        parts.append(f"serialize;dur={ms(serialize_seconds)}")
+    parts.append(f"total;dur={ms(total_seconds)}")
+    return ", ".join(parts)
+
+
+class InstrumentationMiddleware:
+    def __init__(self, app, fastapi_app):
+        self.app = app
+        self.fastapi_app = fastapi_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        request_scope = dict(scope)   # routing rewrites scope in place (path_params, root_path, ...)
+        token = _current.set(stats)
+        status, serialize_seconds = 500, 0.0
+
+        async def send_wrapper(message):
+            nonlocal status, serialize_seconds
+            if message["type"] == "http.response.start":
+                now = time.perf_counter()
+                status = message["status"]
+                if stats.endpoint_end is not None:
+                    serialize_seconds = now - stats.endpoint_end
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", server_timing(stats, now - stats.start, serialize_seconds))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            metrics.observe(scope["method"], _route_label(self.fastapi_app, scope, request_scope), status,
+                            time.perf_counter() - stats.start, stats, serialize_seconds)
+
+
+def metrics_endpoint():
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+def install(app, *engines, path: str = "/metrics"):
+    """Time every registered route, attach SQL listeners, add the middleware and /metrics."""
+    for route in app.router.routes:
+        dependant = getattr(route, "dependant", None)
+        if dependant is not None and dependant.call is not None:
+            dependant.call = _timed(dependant.call)
+    for engine in engines:
+        if engine is not None:
+            instrument_engine(engine)
+    app.add_api_route(path, metrics_endpoint, methods=["GET"], include_in_schema=False)
+    # Added last => outermost, so "total" covers the other middleware too
+    app.add_middleware(InstrumentationMiddleware, fastapi_app=app)
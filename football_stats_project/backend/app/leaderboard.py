@@ -0,0 +1,119 @@
+# backend/app/leaderboard.py
+# Multi-metric leaderboards computed from per-(year, team) rows in one pass.
+#
+# Input rows: {year, team, wins, draws, losses, gf, ga, played} ordered by year
+# (from team_year_stats, the columnar store, or the raw SQL scan).
+import heapq
+import threading
+from collections import OrderedDict
+
+METRICS = ("wins", "gf", "ga", "gd", "points", "win_rate")
+
+# Depth kept in cached cumulative snapshots; deeper requests are computed directly
+SNAPSHOT_TOP = 50
+SNAPSHOT_SLOTS = 32
+
+
+def team_row(team, played, wins, draws, losses, gf, ga) -> dict:
+    return {
+        "team": team,
+        "played": played,
+        "wins": wins, "draws": draws, "losses": losses,
+        "gf": gf, "ga": ga, "gd": gf - ga,
+        "points": 3 * wins + draws,
+        "win_rate": round(wins / played, 3) if played else 0.0,
+    }
+
+
+def rank_key(metric):
+    # Same tie-breakers as /stats/top_by_year: metric, then gf, wins, fewer games
+    return lambda d: (d[metric], d["gf"], d["wins"], -d["played"])
+
+
+def top_rows(rows, metric, n):
+    # heap-based top-N; same order as sorted(..., reverse=True)[:n]
+    return heapq.nlargest(n, rows, key=rank_key(metric))
+
+
+def _by_year(rows):
+    """Yield (year, [row, ...]) groups from year-ordered rows."""
+    current, group = None, []
+    for r in rows:
+        y = int(r["year"])
+        if y != current and group:
+            yield current, group
+            group = []
+        current = y
+        group.append(r)
+    if group:
+        yield current, group
+
+
+def yearly_tops(rows, metrics, top):
+    """[{year, top: {metric: [team_row...]}}] -- per-year totals only."""
+    items = []
+    for y, group in _by_year(rows):
+        teams = [
+            team_row(r["team"], int(r["played"] or 0), int(r["wins"] or 0), int(r["draws"] or 0),
+                     int(r["losses"] or 0), int(r["gf"] or 0), int(r["ga"] or 0))
+            for r in group
+        ]
+        items.append({"year": y, "top": {m: top_rows(teams, m, top) for m in metrics}})
+    return items
+
+
+def cumulative_tops(rows, metrics, top):
+    """[{year, top: {metric: [team_row...]}}] -- totals carried over from all prior years."""
+    cum = {}       # team -> [played, wins, draws, losses, gf, ga]
+    current = {}   # team -> team_row of its totals so far; rebuilt only in years it played
+    items = []
+    for y, group in _by_year(rows):
+        for r in group:
+            t = r["team"]
+            c = cum.setdefault(t, [0, 0, 0, 0, 0, 0])
+            c[0] += int(r["played"] or 0)
+            c[1] += int(r["wins"] or 0)
+            c[2] += int(r["draws"] or 0)
+            c[3] += int(r["losses"] or 0)
+            c[4] += int(r["gf"] or 0)
+            c[5] += int(r["ga"] or 0)
+            current[t] = team_row(t, *c)
+        teams = list(current.values())
+        items.append({"year": y, "top": {m: top_rows(teams, m, top) for m in metrics}})
+    return items
+
+
+# ---------- cached cumulative snapshots ----------
+# Cumulative totals for a year don't depend on where the range *ends*, so every
+# request that starts at the beginning of the data can slice one shared snapshot
+# (per tournament and dataset version) instead of recomputing it.
+
+_snapshots = OrderedDict()   # (tournament, dataset_version) -> items
+_snapshot_lock = threading.Lock()
+
+
+def cumulative_snapshot(key, load_rows):
+    """All-metric cumulative tops (SNAPSHOT_TOP deep) for the full history; built once per key."""
+    with _snapshot_lock:
+        items = _snapshots.get(key)
+        if items is not None:
+            _snapshots.move_to_end(key)
+            return items
+    items = cumulative_tops(load_rows(), METRICS, SNAPSHOT_TOP)
+    with _snapshot_lock:
+        _snapshots[key] = items
+        while len(_snapshots) > SNAPSHOT_SLOTS:
+            _snapshots.popitem(last=False)
+    return items
+
+
+def clear_snapshots():
+    with _snapshot_lock:
+        _snapshots.clear()
+
+
+def slice_snapshot(items, metrics, top, year_to=None):
+    return [
+        {"year": it["year"], "top": {m: it["top"][m][:top] for m in metrics}}
+        for it in items if year_to is None or it["year"] <= year_to
+    ]
@@ -1,14 +1,38 @@
+import asyncio, base64, json, csv, io, os
 from typing import Optional
-from fastapi import FastAPI, Depends, Query          
+from fastapi import FastAPI, Depends, Query, HTTPException
+import anyio
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from sqlalchemy import func, case, text
-from .database import get_db, Base, engine           
-from .models import Match                            
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import tuple_
+from sqlalchemy import func, case, select, text
+from .database import get_db, get_async_db, engine, SessionLocal, async_engine, READ_ONLY
+from .models import Match, Team, TeamMatch, Tournament
+from .columnar import MatchStore, get_store, load_store
+from . import aggregates, dimensions, form, leaderboard, ratings, schema
+from .async_api import router as async_router, get_dictionary as async_dictionary
+from .batch import BatchRequest, run_batch
+from . import coalesce
+from .coalesce import CoalescingMiddleware
+from .cache import (cached, response_cache, on_dataset_change, conditional_get, dataset_version,
+                    poll_dataset_version)
 from fastapi.middleware.cors import CORSMiddleware
-from collections import defaultdict
+from fastapi.responses import StreamingResponse
+from .responses import FastJSONResponse, fast_json, CompressionMiddleware, COMPRESSION_ENABLED
 
-app = FastAPI(title="Football API")
+app = FastAPI(title="Football API", default_response_class=FastJSONResponse)
+
+# Single-flight for identical concurrent reads + per-endpoint concurrency limits (see coalesce.py).
+# Registered first so it sits inside the ETag layer: 304s are answered before reaching it.
+app.add_middleware(CoalescingMiddleware)
+
+# ETag / If-None-Match handling for the read endpoints (see cache.py).
+# Registered before CORS so CORS stays outermost and 304s carry its headers too.
+app.middleware("http")(conditional_get)
+
+# gzip / brotli above FOOTBALL_COMPRESS_MIN_BYTES (see responses.py); wraps the ETag layer
+if COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,12 +43,76 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Server-Timing"],
 )
 
 
 @app.on_event("startup")
 def on_startup():
-    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        # Read-only API processes (FOOTBALL_SQLITE_READONLY) expect a fully built database
+        if not READ_ONLY:
+            _prepare_schema(db)
+        # Optional in-memory stats engine (FOOTBALL_STATS_ENGINE=memory)
+        load_store(db)
+        # Team dictionary + autocomplete index, so the first keystroke doesn't pay for them
+        dimensions.get_dictionary(db).search_index
+    finally:
+        db.close()
+
+
+_version_poller = None
+
+
+@app.on_event("startup")
+async def start_version_poller():
+    # dataset_version lookups and the reloads a new ingest triggers run off the event loop
+    global _version_poller
+    _version_poller = asyncio.create_task(poll_dataset_version())
+
+
+@app.on_event("shutdown")
+async def stop_version_poller():
+    if _version_poller is not None:
+        _version_poller.cancel()
+
+
+@app.on_event("shutdown")
+async def close_async_engine():
+    # aiosqlite keeps a (non-daemon) thread per pooled connection; the process can't exit until they close
+    if async_engine is not None:
+        await async_engine.dispose()
+
+
+def _prepare_schema(db: Session):
+    # Databases from an older release: new columns/indexes, then ids and derived tables
+    schema.migrate_schema(db)
+    schema.backfill_derived(db)
+
+
+on_dataset_change(leaderboard.clear_snapshots)
+
+
+@on_dataset_change
+def _reload_dictionary():
+    # Rebuild the id dictionary and its search index for the new dataset
+    dimensions.clear_dictionary()
+    db = SessionLocal()
+    try:
+        dimensions.get_dictionary(db).search_index
+    finally:
+        db.close()
+
+
+@on_dataset_change
+def _reload_store():
+    # A new ingest landed: rebuild the in-memory engine from SQLite (no-op if disabled)
+    db = SessionLocal()
+    try:
+        load_store(db)
+    finally:
+        db.close()
 
 @app.get("/")
 def root():
@@ -35,19 +123,118 @@ def health():
     return {"ok": True}
 
 @app.get("/matches/count")
+@cached
 def matches_count(team: str | None = None, db: Session = Depends(get_db)):
-    q = db.query(Match)                              
     if team:
-        q = q.filter((Match.home_team == team) | (Match.away_team == team))
-    return {"count": q.count()}
+        # Per-team totals are kept on the teams dimension at ingest
+        info = dimensions.get_dictionary(db).team_info.get(team)
+        return {"count": info["matches"] if info else 0}
+    return {"count": db.query(func.count()).select_from(Match).scalar()}
+
+@async_router.get("/matches/count")
+@cached
+async def matches_count_async(team: str | None = None, db: AsyncSession = Depends(get_async_db)):
+    if team:
+        info = (await async_dictionary()).team_info.get(team)
+        return {"count": info["matches"] if info else 0}
+    return {"count": (await db.execute(select(func.count()).select_from(Match))).scalar()}
 
 
 #http://127.0.0.1:8000/matches
 #http://127.0.0.1:8000/matches?team=England&page_size=10
 #http://127.0.0.1:8000/matches?team=England&opponent=Germany&tournament=FIFA%20World%20Cup
 #http://127.0.0.1:8000/matches?team=Brazil&date_from=1990-01-01&date_to=2017-12-31&page=2&page_size=25
+#http://127.0.0.1:8000/matches?team=Brazil&page_size=200&cursor=<next_cursor from the previous page>
+
+MATCH_FIELDS = ("id", "date", "home_team", "away_team", "home_score", "away_score",
+                "tournament", "city", "country", "neutral")
+
+def _match_dict(m) -> dict:
+    return {
+        "id": m.id,
+        "date": m.date,
+        "home_team": m.home_team,
+        "away_team": m.away_team,
+        "home_score": m.home_score,
+        "away_score": m.away_score,
+        "tournament": m.tournament,
+        "city": m.city,
+        "country": m.country,
+        "neutral": bool(m.neutral),
+    }
+
+def _filter_matches(dims, team, opponent, tournament, date_from, date_to):
+    """
+    Shared filters for /matches (and its /async twin) and /matches/export. Returns
+    (select, date_col, id_col): with a team (or opponent) the query is driven by
+    team_matches' (team, date) index and pages/orders on its columns; otherwise it
+    runs on matches directly.
+    """
+    anchor, other = (team, opponent) if team else (opponent, None)
+    if anchor:
+        q = (select(Match)
+               .join(TeamMatch, TeamMatch.match_id == Match.id)
+               .filter(TeamMatch.team_id == dims.team_id(anchor)))
+        if other:
+            q = q.filter(TeamMatch.opponent_id == dims.team_id(other))
+        date_col, id_col, tournament_col = TeamMatch.date, TeamMatch.match_id, TeamMatch.tournament_id
+    else:
+        q = select(Match)
+        date_col, id_col, tournament_col = Match.date, Match.id, Match.tournament_id
+    if tournament:
+        q = q.filter(tournament_col == dims.tournament_id(tournament))
+    if date_from:
+        q = q.filter(date_col >= date_from)
+    if date_to:
+        q = q.filter(date_col <= date_to)
+    return q, date_col, id_col
+
+def _encode_cursor(date: str, match_id: int, total: Optional[int]) -> str:
+    # Opaque keyset cursor: last (date, id) of the page, plus the total so later pages needn't recount
+    raw = json.dumps([date, match_id, total], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        date, match_id, total = json.loads(raw)
+        return str(date), int(match_id), (int(total) if total is not None else None)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+
+def _page_plan(cursor: Optional[str], include_total: Optional[bool]):
+    """(after, total, count): keyset position or None, the total so far, whether to run the count."""
+    if not cursor:
+        return None, None, include_total is not False
+    last_date, last_id, total = _decode_cursor(cursor)
+    if include_total is False:
+        total = None
+    return (last_date, last_id), total, bool(include_total) and total is None
+
+def _count_query(q):
+    return select(func.count()).select_from(q.subquery())
+
+def _page_query(q, date_col, id_col, after, page: int, page_size: int):
+    if after:
+        q = q.filter(tuple_(date_col, id_col) > tuple_(*after))
+    else:
+        q = q.offset((page - 1) * page_size)
+    # One extra row tells us whether there is a next page
+    return q.order_by(date_col.asc(), id_col.asc()).limit(page_size + 1)
+
+def _page_body(rows, page: Optional[int], page_size: int, total: Optional[int]) -> dict:
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    return {
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "next_cursor": _encode_cursor(rows[-1].date, rows[-1].id, total) if has_more else None,
+        "items": [_match_dict(m) for m in rows],
+    }
 
 @app.get("/matches")
+@fast_json("items")
 def list_matches(
     team: Optional[str] = None,
     opponent: Optional[str] = None,
@@ -56,117 +243,161 @@ def list_matches(
     date_to: Optional[str] = None,
     page: int = Query(1, ge=1),
     page_size: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,            # next_cursor from a previous page (keyset mode; `page` is ignored)
+    include_total: Optional[bool] = None,    # default: count on offset pages, reuse the cursor's count otherwise
     db: Session = Depends(get_db),
 ):
-    q = db.query(Match)
+    q, date_col, id_col = _filter_matches(dimensions.get_dictionary(db), team, opponent, tournament,
+                                          date_from, date_to)
+    after, total, count = _page_plan(cursor, include_total)
+    if count:
+        total = db.execute(_count_query(q)).scalar()
+    rows = db.execute(_page_query(q, date_col, id_col, after, page, page_size)).scalars().all()
+    return _page_body(rows, None if cursor else page, page_size, total)
 
-    if team:
-        q = q.filter(or_(Match.home_team == team, Match.away_team == team))
-    if opponent:
-        q = q.filter(or_(Match.home_team == opponent, Match.away_team == opponent))
-    if tournament:
-        q = q.filter(Match.tournament == tournament)
-    if date_from:
-        q = q.filter(Match.date >= date_from)
-    if date_to:
-        q = q.filter(Match.date <= date_to)
-
-    total = q.count()
-    rows = (
-        q.order_by(Match.date.asc(), Match.id.asc())
-         .offset((page - 1) * page_size)
-         .limit(page_size)
-         .all()
-    )
+@async_router.get("/matches")
+@fast_json("items")
+async def list_matches_async(
+    team: Optional[str] = None,
+    opponent: Optional[str] = None,
+    tournament: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    include_total: Optional[bool] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    q, date_col, id_col = _filter_matches(await async_dictionary(), team, opponent, tournament,
+                                          date_from, date_to)
+    after, total, count = _page_plan(cursor, include_total)
+    if count:
+        total = (await db.execute(_count_query(q))).scalar()
+    rows = (await db.execute(_page_query(q, date_col, id_col, after, page, page_size))).scalars().all()
+    return _page_body(rows, None if cursor else page, page_size, total)
 
-    return {
-        "page": page,
-        "page_size": page_size,
-        "total": total,
-        "items": [
-            {
-                "id": m.id,
-                "date": m.date,
-                "home_team": m.home_team,
-                "away_team": m.away_team,
-                "home_score": m.home_score,
-                "away_score": m.away_score,
-                "tournament": m.tournament,
-                "city": m.city,
-                "country": m.country,
-                "neutral": bool(m.neutral),
-            } for m in rows
-        ],
-    }
 
-#http://127.0.0.1:8000/stats/yearly?team=England
-#http://127.0.0.1:8000/stats/yearly?team=United%20States&date_from=2000-01-01&date_to=2017-12-31
+#http://127.0.0.1:8000/matches/export?team=Brazil
+#http://127.0.0.1:8000/matches/export?format=csv&tournament=FIFA%20World%20Cup&date_from=1990-01-01
 
-@app.get("/stats/yearly")
-def stats_yearly(
-    team: str,                               # REQUIRED: the team to summarize
+EXPORT_BATCH = 1000
+
+@app.get("/matches/export")
+def export_matches(
+    team: Optional[str] = None,
+    opponent: Optional[str] = None,
     tournament: Optional[str] = None,
-    date_from: Optional[str] = None,         # 'YYYY-MM-DD'
-    date_to: Optional[str] = None,           # 'YYYY-MM-DD'
-    db: Session = Depends(get_db),
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
 ):
-    # YEAR as first 4 chars of the ISO date string (SQLite friendly)
-    year = func.substr(Match.date, 1, 4).label("year")
-
-    is_home = (Match.home_team == team)
-    is_away = (Match.away_team == team)
-
-    wins = func.sum(case(
-        ((is_home & (Match.home_score > Match.away_score)), 1),
-        ((is_away & (Match.away_score > Match.home_score)), 1),
-        else_=0
-    )).label("wins")
-
-    draws = func.sum(case(
-        (((is_home | is_away) & (Match.home_score == Match.away_score)), 1),
-        else_=0
-    )).label("draws")
-
-    losses = func.sum(case(
-        ((is_home & (Match.home_score < Match.away_score)), 1),
-        ((is_away & (Match.away_score < Match.home_score)), 1),
-        else_=0
-    )).label("losses")
-
-    gf = func.sum(case(
-        (is_home, Match.home_score),
-        (is_away, Match.away_score),
-        else_=0
-    )).label("gf")
-
-    ga = func.sum(case(
-        (is_home, Match.away_score),
-        (is_away, Match.home_score),
-        else_=0
-    )).label("ga")
-
-    played = func.count().label("matches")
-
-    q = (db.query(year, played, wins, draws, losses, gf, ga)
-           .filter(is_home | is_away))
+    """
+    Stream every match matching the /matches filters as NDJSON or CSV.
+    Rows come off the cursor in EXPORT_BATCH chunks (yield_per), so memory stays
+    flat regardless of result size.
+    """
+    def rows():
+        # The generator outlives the request handler, so it owns its session
+        db = SessionLocal()
+        try:
+            q, date_col, id_col = _filter_matches(dimensions.get_dictionary(db), team, opponent,
+                                                  tournament, date_from, date_to)
+            # Same order as /matches, on the columns of the index that drives the query
+            q = q.order_by(date_col.asc(), id_col.asc()).execution_options(yield_per=EXPORT_BATCH)
+            yield from db.execute(q).scalars()
+        finally:
+            db.close()
+
+    def ndjson():
+        buf = []
+        for m in rows():
+            buf.append(json.dumps(_match_dict(m)))
+            if len(buf) >= EXPORT_BATCH:
+                yield "\n".join(buf) + "\n"; buf.clear()
+        if buf:
+            yield "\n".join(buf) + "\n"
+
+    def csv_rows():
+        out = io.StringIO()
+        w = csv.writer(out)
+        w.writerow(MATCH_FIELDS)
+        for i, m in enumerate(rows(), start=1):
+            d = _match_dict(m)
+            w.writerow([d[f] for f in MATCH_FIELDS])
+            if i % EXPORT_BATCH == 0:
+                yield out.getvalue(); out.seek(0); out.truncate()
+        yield out.getvalue()
+
+    if format == "csv":
+        body, media_type = csv_rows(), "text/csv"
+    else:
+        body, media_type = ndjson(), "application/x-ndjson"
+    return StreamingResponse(
+        body, media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="matches.{format}"'},
+    )
+
+#http://127.0.0.1:8000/stats/yearly?team=England
+#http://127.0.0.1:8000/stats/yearly?team=United%20States&date_from=2000-01-01&date_to=2017-12-31
+
+def _result_count(result: str):
+    # SUM over a boolean comes back typed as bool; count via CASE instead
+    return func.sum(case((TeamMatch.result == result, 1), else_=0))
+
+
+def _yearly_rows_sql(dims, teams, tournament, date_from, date_to):
+    """Yearly rows (team ids) for several teams in one GROUP BY team, year over team_matches."""
+    year = TeamMatch.year.label("year")
+
+    q = (select(
+            TeamMatch.team_id.label("team"),
+            year,
+            func.count().label("matches"),
+            _result_count("W").label("wins"),
+            _result_count("D").label("draws"),
+            _result_count("L").label("losses"),
+            func.sum(TeamMatch.goals_for).label("gf"),
+            func.sum(TeamMatch.goals_against).label("ga"),
+         )
+         .filter(TeamMatch.team_id.in_([dims.team_id(t) for t in teams])))
 
     if tournament:
-        q = q.filter(Match.tournament == tournament)
-    if date_from:
-        q = q.filter(Match.date >= date_from)
-    if date_to:
-        q = q.filter(Match.date <= date_to)
+        q = q.filter(TeamMatch.tournament_id == dims.tournament_id(tournament))
+    q = aggregates.filter_dates(q, TeamMatch.date, TeamMatch.date_key, TeamMatch.year, date_from, date_to)
+
+    return (q.group_by(TeamMatch.team_id, year)
+              .order_by(TeamMatch.team_id.asc(), year.asc()))
+
+def _yearly_query(dims, teams, tournament, date_from, date_to):
+    """(statement, team names by id or None) for the SQL source that fits the filters."""
+    years = aggregates.whole_years(date_from, date_to)
+    if years is not None:
+        return aggregates.yearly_rows_query(teams, tournament, *years), None
+    # Partial-year range: fall back to the raw scan
+    return _yearly_rows_sql(dims, teams, tournament, date_from, date_to), dims.team_names
 
-    rows = (q.group_by(year)
-              .order_by(year.asc())
-              .all())
+def _yearly_rows_by_team(db: Session, store, teams, tournament, date_from, date_to):
+    """{team: yearly rows} from whichever source fits the filters -- one pass for all teams."""
+    if store is not None:
+        return store.yearly_many(teams, tournament, date_from, date_to)
+    q, names = _yearly_query(dimensions.get_dictionary(db), teams, tournament, date_from, date_to)
+    return aggregates.rows_by_team(db.execute(q), teams, names)
 
+async def _yearly_rows_by_team_async(db: AsyncSession, store, teams, tournament, date_from, date_to):
+    if store is not None:
+        # NumPy work: keep it off the event loop
+        return await anyio.to_thread.run_sync(store.yearly_many, teams, tournament, date_from, date_to)
+    q, names = _yearly_query(await async_dictionary(), teams, tournament, date_from, date_to)
+    return aggregates.rows_by_team(await db.execute(q), teams, names)
+
+def _yearly_items(rows) -> list:
     items = []
     for r in rows:
-        yr = int(r.year)
-        matches = int(r.matches or 0)
-        w = int(r.wins or 0); d = int(r.draws or 0); l = int(r.losses or 0)
-        goals_for = int(r.gf or 0); goals_against = int(r.ga or 0)
+        yr = int(r["year"])
+        matches = int(r["matches"] or 0)
+        w = int(r["wins"] or 0); d = int(r["draws"] or 0); l = int(r["losses"] or 0)
+        goals_for = int(r["gf"] or 0); goals_against = int(r["ga"] or 0)
         gd = goals_for - goals_against
         win_rate = (w / matches) if matches else 0.0
         items.append({
@@ -176,92 +407,144 @@ def stats_yearly(
             "gf": goals_for, "ga": goals_against, "gd": gd,
             "win_rate": round(win_rate, 3),
         })
+    return items
 
-    return {"team": team, "tournament": tournament, "items": items}
+@app.get("/stats/yearly")
+@fast_json("items")
+@cached
+def stats_yearly(
+    team: str,                               # REQUIRED: the team to summarize
+    tournament: Optional[str] = None,
+    date_from: Optional[str] = None,         # 'YYYY-MM-DD'
+    date_to: Optional[str] = None,           # 'YYYY-MM-DD'
+    db: Session = Depends(get_db),
+    store: Optional[MatchStore] = Depends(get_store),
+):
+    rows = _yearly_rows_by_team(db, store, [team], tournament, date_from, date_to)[team]
+    return {"team": team, "tournament": tournament, "items": _yearly_items(rows)}
 
-#http://127.0.0.1:8000/stats/opponents?team=Brazil
-#http://127.0.0.1:8000/stats/opponents?team=Spain&tournament=UEFA%20European%20Championship
-#http://127.0.0.1:8000/stats/opponents?team=Italy&date_from=2000-01-01&date_to=2010-12-31
+@async_router.get("/stats/yearly")
+@fast_json("items")
+@cached
+async def stats_yearly_async(
+    team: str,
+    tournament: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    store: Optional[MatchStore] = Depends(get_store),
+):
+    rows = (await _yearly_rows_by_team_async(db, store, [team], tournament, date_from, date_to))[team]
+    return {"team": team, "tournament": tournament, "items": _yearly_items(rows)}
 
-@app.get("/stats/opponents")
-def stats_opponents(
-    team: str,                               # REQUIRED: the team to summarize
+#http://127.0.0.1:8000/stats/yearly/batch?teams=Brazil&teams=Argentina&teams=Germany
+#http://127.0.0.1:8000/stats/yearly/batch?teams=Spain&teams=Italy&tournament=UEFA%20European%20Championship
+
+MAX_BATCH_TEAMS = 100
+
+def _batch_teams(teams) -> list:
+    teams = list(dict.fromkeys(t for t in teams if t))
+    if not teams or len(teams) > MAX_BATCH_TEAMS:
+        raise HTTPException(status_code=400, detail=f"give 1-{MAX_BATCH_TEAMS} teams")
+    return teams
+
+@app.get("/stats/yearly/batch")
+@fast_json("teams")
+@cached
+def stats_yearly_batch(
+    teams: list[str] = Query(...),           # repeat the parameter: ?teams=A&teams=B
     tournament: Optional[str] = None,
     date_from: Optional[str] = None,         # 'YYYY-MM-DD'
     date_to: Optional[str] = None,           # 'YYYY-MM-DD'
-    min_matches: int = Query(1, ge=1),
-    top: int = Query(25, ge=1, le=200),
     db: Session = Depends(get_db),
+    store: Optional[MatchStore] = Depends(get_store),
+):
+    """/stats/yearly for several teams at once: one grouped pass instead of one scan per team."""
+    teams = _batch_teams(teams)
+    by_team = _yearly_rows_by_team(db, store, teams, tournament, date_from, date_to)
+    return {
+        "tournament": tournament,
+        "teams": [{"team": t, "items": _yearly_items(by_team[t])} for t in teams],
+    }
+
+@async_router.get("/stats/yearly/batch")
+@fast_json("teams")
+@cached
+async def stats_yearly_batch_async(
+    teams: list[str] = Query(...),
+    tournament: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    store: Optional[MatchStore] = Depends(get_store),
 ):
-    is_home = (Match.home_team == team)
-    is_away = (Match.away_team == team)
+    teams = _batch_teams(teams)
+    by_team = await _yearly_rows_by_team_async(db, store, teams, tournament, date_from, date_to)
+    return {
+        "tournament": tournament,
+        "teams": [{"team": t, "items": _yearly_items(by_team[t])} for t in teams],
+    }
 
-    # Opponent name from the team's perspective
-    opponent = case(
-        (is_home, Match.away_team),
-        (is_away, Match.home_team),
-        else_="(unknown)"
-    ).label("opponent")
+def _yearly_group(teams, tournament, date_from, date_to) -> dict:
+    # Merged /stats/yearly pass for POST /batch: {team: same body as /stats/yearly}
+    db = SessionLocal()
+    try:
+        by_team = _yearly_rows_by_team(db, get_store(), teams, tournament, date_from, date_to)
+    finally:
+        db.close()
+    return {t: {"team": t, "tournament": tournament, "items": _yearly_items(by_team[t])} for t in teams}
+
+@app.post("/batch")
+async def batch(request: BatchRequest):
+    """
+    Several read queries in one round trip; /stats/yearly ones sharing filters are merged
+    into one grouped pass, the rest run concurrently (see batch.py).
+    """
+    return FastJSONResponse(await run_batch(app, request.queries, _yearly_group))
+
+#http://127.0.0.1:8000/stats/opponents?team=Brazil
+#http://127.0.0.1:8000/stats/opponents?team=Spain&tournament=UEFA%20European%20Championship
+#http://127.0.0.1:8000/stats/opponents?team=Italy&date_from=2000-01-01&date_to=2010-12-31
 
+def _opponent_rows_sql(dims, team, tournament, date_from, date_to, min_matches, top):
+    # Grouped on the opponent id; the teams join only supplies the name (and its sort order)
+    opponent = Team.name.label("opponent")
     played = func.count().label("played")
 
-    wins = func.sum(case(
-        ((is_home & (Match.home_score > Match.away_score)), 1),
-        ((is_away & (Match.away_score > Match.home_score)), 1),
-        else_=0
-    )).label("wins")
-
-    draws = func.sum(case(
-        (((is_home | is_away) & (Match.home_score == Match.away_score)), 1),
-        else_=0
-    )).label("draws")
-
-    losses = func.sum(case(
-        ((is_home & (Match.home_score < Match.away_score)), 1),
-        ((is_away & (Match.away_score < Match.home_score)), 1),
-        else_=0
-    )).label("losses")
-
-    gf = func.sum(case(
-        (is_home, Match.home_score),
-        (is_away, Match.away_score),
-        else_=0
-    )).label("gf")
-
-    ga = func.sum(case(
-        (is_home, Match.away_score),
-        (is_away, Match.home_score),
-        else_=0
-    )).label("ga")
-
-    q = (db.query(opponent, played, wins, draws, losses, gf, ga)
-           .filter(is_home | is_away))
+    q = (select(
+            opponent,
+            played,
+            _result_count("W").label("wins"),
+            _result_count("D").label("draws"),
+            _result_count("L").label("losses"),
+            func.sum(TeamMatch.goals_for).label("gf"),
+            func.sum(TeamMatch.goals_against).label("ga"),
+         )
+         .join(Team, Team.id == TeamMatch.opponent_id)
+         .filter(TeamMatch.team_id == dims.team_id(team)))
 
     if tournament:
-        q = q.filter(Match.tournament == tournament)
-    if date_from:
-        q = q.filter(Match.date >= date_from)
-    if date_to:
-        q = q.filter(Match.date <= date_to)
+        q = q.filter(TeamMatch.tournament_id == dims.tournament_id(tournament))
+    q = aggregates.filter_dates(q, TeamMatch.date, TeamMatch.date_key, TeamMatch.year, date_from, date_to)
 
-    rows = (q.group_by(opponent)
+    return (q.group_by(TeamMatch.opponent_id)
               .having(played >= min_matches)
-              .order_by(played.desc(), opponent.asc())
-              .limit(top)
-              .all())
+              .order_by(played.desc(), Team.name.asc())
+              .limit(top))
 
+def _opponents_body(team, tournament, rows) -> dict:
     items = []
     for r in rows:
-        p = int(r.played or 0)
-        w = int(r.wins or 0)
-        d = int(r.draws or 0)
-        l = int(r.losses or 0)
-        goals_for = int(r.gf or 0)
-        goals_against = int(r.ga or 0)
+        p = int(r["played"] or 0)
+        w = int(r["wins"] or 0)
+        d = int(r["draws"] or 0)
+        l = int(r["losses"] or 0)
+        goals_for = int(r["gf"] or 0)
+        goals_against = int(r["ga"] or 0)
         gd = goals_for - goals_against
         win_rate = (w / p) if p else 0.0
         items.append({
-            "opponent": r.opponent,
+            "opponent": r["opponent"],
             "played": p,
             "wins": w, "draws": d, "losses": l,
             "gf": goals_for, "ga": goals_against, "gd": gd,
@@ -274,33 +557,156 @@ def stats_opponents(
         "items": items
     }
 
-#http://127.0.0.1:8000/stats/top_by_year?metric=gf&top=15
-#http://127.0.0.1:8000/stats/top_by_year?metric=wins&top=10&date_from=1990-01-01&date_to=2017-12-31
 
-@app.get("/stats/top_by_year")
-def top_by_year(
-    metric: str = "wins",                   # "wins" or "gf"
-    top: int = 10,
+@app.get("/stats/opponents")
+@fast_json("items")
+@cached
+def stats_opponents(
+    team: str,                               # REQUIRED: the team to summarize
     tournament: Optional[str] = None,
-    date_from: Optional[str] = None,        # 'YYYY-MM-DD'
-    date_to: Optional[str] = None,          # 'YYYY-MM-DD'
+    date_from: Optional[str] = None,         # 'YYYY-MM-DD'
+    date_to: Optional[str] = None,           # 'YYYY-MM-DD'
+    min_matches: int = Query(1, ge=1),
+    top: int = Query(25, ge=1, le=200),
     db: Session = Depends(get_db),
+    store: Optional[MatchStore] = Depends(get_store),
+):
+    if store is not None:
+        rows = store.opponents(team, tournament, date_from, date_to, min_matches, top)
+    else:
+        q = _opponent_rows_sql(dimensions.get_dictionary(db), team, tournament, date_from, date_to,
+                               min_matches, top)
+        rows = [r._asdict() for r in db.execute(q)]
+    return _opponents_body(team, tournament, rows)
+
+@async_router.get("/stats/opponents")
+@fast_json("items")
+@cached
+async def stats_opponents_async(
+    team: str,
+    tournament: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    min_matches: int = Query(1, ge=1),
+    top: int = Query(25, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db),
+    store: Optional[MatchStore] = Depends(get_store),
+):
+    if store is not None:
+        rows = await anyio.to_thread.run_sync(store.opponents, team, tournament, date_from, date_to,
+                                              min_matches, top)
+    else:
+        q = _opponent_rows_sql(await async_dictionary(), team, tournament, date_from, date_to,
+                               min_matches, top)
+        rows = [r._asdict() for r in await db.execute(q)]
+    return _opponents_body(team, tournament, rows)
+
+#http://127.0.0.1:8000/stats/head_to_head?tournament=FIFA%20World%20Cup&date_from=2018-01-01&date_to=2018-12-31
+#http://127.0.0.1:8000/stats/head_to_head?teams=Brazil&teams=Argentina&teams=Uruguay&encoding=sparse
+
+H2H_METRICS = ("played", "wins", "draws", "losses", "gf", "ga")
+MAX_MATRIX_TEAMS = 128
+
+def _head_to_head_sql(db: Session, teams, tournament, date_from, date_to):
+    """(teams, {metric: flat N*N list}) from one GROUP BY team, opponent over team_matches."""
+    dims = dimensions.get_dictionary(db)
+
+    def filtered(q):
+        if tournament:
+            q = q.filter(TeamMatch.tournament_id == dims.tournament_id(tournament))
+        return aggregates.filter_dates(q, TeamMatch.date, TeamMatch.date_key, TeamMatch.year,
+                                       date_from, date_to)
+
+    if teams is None:
+        teams = sorted(dims.team_names[i] for (i,) in filtered(db.query(TeamMatch.team_id).distinct()))
+    n = len(teams)
+    ids = [dims.team_id(t) for t in teams]
+    pos = {i: k for k, i in enumerate(ids)}
+    cells = {m: [0] * (n * n) for m in H2H_METRICS}
+
+    q = filtered(db.query(
+            TeamMatch.team_id,
+            TeamMatch.opponent_id,
+            func.count(),
+            _result_count("W"),
+            _result_count("D"),
+            _result_count("L"),
+            func.sum(TeamMatch.goals_for),
+            func.sum(TeamMatch.goals_against),
+         )
+         .filter(TeamMatch.team_id.in_(ids), TeamMatch.opponent_id.in_(ids)))
+    for team, opponent, *values in q.group_by(TeamMatch.team_id, TeamMatch.opponent_id):
+        k = pos[team] * n + pos[opponent]
+        for m, v in zip(H2H_METRICS, values):
+            cells[m][k] = int(v or 0)
+    return teams, cells
+
+@app.get("/stats/head_to_head")
+@fast_json()
+@cached
+def head_to_head(
+    teams: Optional[list[str]] = Query(None),  # ?teams=A&teams=B...; default: every team under the filters
+    tournament: Optional[str] = None,
+    date_from: Optional[str] = None,           # 'YYYY-MM-DD'
+    date_to: Optional[str] = None,             # 'YYYY-MM-DD'
+    encoding: str = Query("dense", pattern="^(dense|sparse)$"),
+    db: Session = Depends(get_db),
+    store: Optional[MatchStore] = Depends(get_store),
 ):
     """
-    For each year: compute per-team totals and keep the top-N by `metric`.
-    metric = "wins" (match wins) or "gf" (goals for).
+    N x N head-to-head records (played/wins/draws/losses/gf/ga) among a set of teams, in one pass.
+    dense:  matrix[metric] is a row-major list of N*N ints; cell i*N + j = teams[i] vs teams[j]
+    sparse: matrix = {i: [...], j: [...], metric: [...]} for the pairs that met
     """
+    if teams is not None:
+        teams = list(dict.fromkeys(t for t in teams if t))
+    elif not (tournament or date_from or date_to):
+        raise HTTPException(status_code=400, detail="give teams, or a tournament / date range to take them from")
+
+    if store is not None:
+        teams, cells = store.head_to_head(teams, tournament, date_from, date_to)
+    else:
+        teams, cells = _head_to_head_sql(db, teams, tournament, date_from, date_to)
+    n = len(teams)
+    if n > MAX_MATRIX_TEAMS:
+        raise HTTPException(status_code=400, detail=f"at most {MAX_MATRIX_TEAMS} teams per matrix (got {n})")
+
+    if encoding == "sparse":
+        met = [k for k, p in enumerate(cells["played"]) if p]
+        matrix = {"i": [k // n for k in met], "j": [k % n for k in met],
+                  **{m: [cells[m][k] for k in met] for m in H2H_METRICS}}
+    else:
+        matrix = cells
+    return {
+        "tournament": tournament,
+        "teams": teams,
+        "metrics": list(H2H_METRICS),
+        "encoding": encoding,
+        "matrix": matrix,
+    }
+
+#http://127.0.0.1:8000/stats/top_by_year?metric=gf&top=15
+#http://127.0.0.1:8000/stats/top_by_year?metric=wins&top=10&date_from=1990-01-01&date_to=2017-12-31
 
+def _per_team_year_rows_sql(db: Session, tournament, date_from, date_to):
+    """(year, team, wins, draws, losses, gf, ga, played) rows ordered by year, team -- shared by the leaderboards."""
     # Build shared filters once (applied to both home/away halves)
     where = ["1=1"]
     params = {}
     if tournament:
-        where.append("tournament = :tournament")
-        params["tournament"] = tournament
-    if date_from:
+        where.append("tournament_id = :tournament_id")
+        params["tournament_id"] = dimensions.get_dictionary(db).tournament_id(tournament)
+    # Integer year/date_key bounds so (tournament, year) and the year indexes can drive the scan
+    if date_from and aggregates.is_date_prefix(date_from):
+        where.append("year >= :year_from AND date_key >= :key_from")
+        params.update(year_from=int(date_from[:4]), key_from=aggregates.date_key(date_from))
+    elif date_from:
         where.append("date >= :date_from")
         params["date_from"] = date_from
-    if date_to:
+    if date_to and aggregates.is_date_prefix(date_to):
+        where.append("year <= :year_to AND date_key <= :key_to")
+        params.update(year_to=int(date_to[:4]), key_to=aggregates.date_key(date_to))
+    elif date_to:
         where.append("date <= :date_to")
         params["date_to"] = date_to
     where_sql = " AND ".join(where)
@@ -308,35 +714,88 @@ def top_by_year(
     sql = f"""
     WITH per_team_year AS (
       -- Home side perspective
-      SELECT substr(date,1,4) AS year,
-             home_team AS team,
-             CASE WHEN home_score > away_score THEN 1 ELSE 0 END AS win,
-             home_score AS gf
+      SELECT year,
+             home_team_id AS team_id,
+             home_score AS gf,
+             away_score AS ga
       FROM matches
       WHERE {where_sql}
       UNION ALL
       -- Away side perspective
-      SELECT substr(date,1,4) AS year,
-             away_team AS team,
-             CASE WHEN away_score > home_score THEN 1 ELSE 0 END AS win,
-             away_score AS gf
+      SELECT year,
+             away_team_id AS team_id,
+             away_score AS gf,
+             home_score AS ga
       FROM matches
       WHERE {where_sql}
     ),
     agg AS (
       SELECT year,
-             team,
-             SUM(win) AS wins,
+             team_id,
+             SUM(CASE WHEN gf > ga THEN 1 ELSE 0 END) AS wins,
+             SUM(CASE WHEN gf = ga THEN 1 ELSE 0 END) AS draws,
+             SUM(CASE WHEN gf < ga THEN 1 ELSE 0 END) AS losses,
              SUM(gf)  AS gf,
+             SUM(ga)  AS ga,
              COUNT(*) AS played
       FROM per_team_year
-      GROUP BY year, team
+      GROUP BY year, team_id
     )
-    SELECT year, team, wins, gf, played
-    FROM agg
-    ORDER BY year ASC, team ASC
+    -- Names only for the output rows (and their order)
+    SELECT year, t.name AS team, wins, draws, losses, gf, ga, played
+    FROM agg JOIN teams t ON t.id = agg.team_id
+    ORDER BY year ASC, t.name ASC
+    """
+    return db.execute(text(sql), params).mappings().all()
+
+
+def _per_team_year_rows(db: Session, store, tournament, date_from, date_to):
+    # In-memory engine > team_year_stats (whole-year ranges) > raw scan
+    years = aggregates.whole_years(date_from, date_to)
+    if store is not None:
+        return store.per_team_year(tournament, date_from, date_to)
+    if years is not None:
+        return aggregates.per_team_year_rows(db, tournament, *years)
+    return _per_team_year_rows_sql(db, tournament, date_from, date_to)
+
+
+def _cumulative_items(db: Session, store, metrics, top, tournament, date_from, date_to):
+    """
+    Cumulative per-year tops. Ranges that start at the beginning of the data and end on a
+    year boundary slice the cached full-history snapshot instead of recomputing it.
+    """
+    years = aggregates.whole_years(None, date_to)
+    first = dimensions.get_dictionary(db).first_match
+    # Only ranges from the start of history can use the snapshot; check before building it
+    from_start = not date_from or (first is not None and date_from <= f"{first[:4]}-01-01")
+    if 0 <= top <= leaderboard.SNAPSHOT_TOP and years is not None and from_start:
+        snap = leaderboard.cumulative_snapshot(
+            (tournament or None, dataset_version()),
+            lambda: _per_team_year_rows(db, store, tournament, None, None),
+        )
+        if snap:
+            return leaderboard.slice_snapshot(snap, metrics, top, years[1])
+    rows = _per_team_year_rows(db, store, tournament, date_from, date_to)
+    return leaderboard.cumulative_tops(rows, metrics, top)
+
+
+@app.get("/stats/top_by_year")
+@fast_json("items")
+@cached
+def top_by_year(
+    metric: str = "wins",                   # "wins" or "gf"
+    top: int = 10,
+    tournament: Optional[str] = None,
+    date_from: Optional[str] = None,        # 'YYYY-MM-DD'
+    date_to: Optional[str] = None,          # 'YYYY-MM-DD'
+    db: Session = Depends(get_db),
+    store: Optional[MatchStore] = Depends(get_store),
+):
+    """
+    For each year: compute per-team totals and keep the top-N by `metric`.
+    metric = "wins" (match wins) or "gf" (goals for).
     """
-    rows = db.execute(text(sql), params).mappings().all()
+    rows = _per_team_year_rows(db, store, tournament, date_from, date_to)
 
     # Group in Python and keep top N per year by chosen metric
     by_year = {}
@@ -365,6 +824,8 @@ def top_by_year(
 #http://127.0.0.1:8000/stats/top_cumulative?metric=wins&top=10&date_from=1950-01-01&date_to=2017-12-31
 
 @app.get("/stats/top_cumulative")
+@fast_json("items")
+@cached
 def top_cumulative(
     metric: str = "wins",                   # "wins" or "gf"
     top: int = 10,
@@ -372,104 +833,312 @@ def top_cumulative(
     date_from: Optional[str] = None,        # 'YYYY-MM-DD'
     date_to: Optional[str] = None,          # 'YYYY-MM-DD'
     db: Session = Depends(get_db),
+    store: Optional[MatchStore] = Depends(get_store),
 ):
     """
     Cumulative leaders: for each year, totals are carried over from all prior years.
     Returns: [{year, top: [{team, wins, gf, played}...]}]
     """
-    where = ["1=1"]
-    params = {}
-    if tournament:
-        where.append("tournament = :tournament")
-        params["tournament"] = tournament
-    if date_from:
-        where.append("date >= :date_from")
-        params["date_from"] = date_from
-    if date_to:
-        where.append("date <= :date_to")
-        params["date_to"] = date_to
-    where_sql = " AND ".join(where)
+    metric_key = "wins" if metric != "gf" else "gf"
+    items = [
+        {"year": it["year"],
+         "top": [{"team": d["team"], "wins": d["wins"], "gf": d["gf"], "played": d["played"]}
+                 for d in it["top"][metric_key]]}
+        for it in _cumulative_items(db, store, [metric_key], top, tournament, date_from, date_to)
+    ]
 
-    sql = f"""
-    WITH per_team_year AS (
-      -- Home perspective
-      SELECT substr(date,1,4) AS year,
-             home_team AS team,
-             CASE WHEN home_score > away_score THEN 1 ELSE 0 END AS win,
-             home_score AS gf
-      FROM matches
-      WHERE {where_sql}
-      UNION ALL
-      -- Away perspective
-      SELECT substr(date,1,4) AS year,
-             away_team AS team,
-             CASE WHEN away_score > home_score THEN 1 ELSE 0 END AS win,
-             away_score AS gf
-      FROM matches
-      WHERE {where_sql}
-    ),
-    yearly AS (
-      SELECT year, team,
-             SUM(win)  AS wins,
-             SUM(gf)   AS gf,
-             COUNT(*)  AS played
-      FROM per_team_year
-      GROUP BY year, team
-    )
-    SELECT year, team, wins, gf, played
-    FROM yearly
-    ORDER BY year ASC, team ASC
+    return {"metric": metric_key, "top": top, "items": items}
+
+
+#http://127.0.0.1:8000/stats/leaderboard
+#http://127.0.0.1:8000/stats/leaderboard?metrics=points,gd&mode=cumulative&top=5&date_from=1990-01-01
+
+@app.get("/stats/leaderboard")
+@fast_json("yearly", "cumulative")
+@cached
+def stats_leaderboard(
+    metrics: str = ",".join(leaderboard.METRICS),   # comma-separated subset of METRICS
+    mode: str = Query("both", pattern="^(yearly|cumulative|both)$"),
+    top: int = Query(10, ge=1, le=200),
+    tournament: Optional[str] = None,
+    date_from: Optional[str] = None,        # 'YYYY-MM-DD'
+    date_to: Optional[str] = None,          # 'YYYY-MM-DD'
+    db: Session = Depends(get_db),
+    store: Optional[MatchStore] = Depends(get_store),
+):
+    """
+    Several leaderboards from one scan: per-year and/or cumulative top-N for each metric.
+    Returns: {yearly: [{year, top: {metric: [...]}}], cumulative: [...same...]}
     """
-    rows = db.execute(text(sql), params).mappings().all()
+    wanted = [m.strip() for m in metrics.split(",") if m.strip()]
+    unknown = [m for m in wanted if m not in leaderboard.METRICS]
+    if unknown or not wanted:
+        raise HTTPException(status_code=400,
+                            detail=f"metrics must be a subset of {', '.join(leaderboard.METRICS)}")
 
-    # Build cumulative totals
-    cum = defaultdict(lambda: {"wins": 0, "gf": 0, "played": 0})
-    items = []
-    metric_key = "wins" if metric != "gf" else "gf"
+    out = {"metrics": wanted, "top": top, "tournament": tournament}
+    if mode in ("yearly", "both"):
+        rows = _per_team_year_rows(db, store, tournament, date_from, date_to)
+        out["yearly"] = leaderboard.yearly_tops(rows, wanted, top)
+    if mode in ("cumulative", "both"):
+        out["cumulative"] = _cumulative_items(db, store, wanted, top, tournament, date_from, date_to)
+    return out
 
-    def snapshot(year_val):
-        # Take a snapshot of *all teams seen so far* and keep top N
-        all_rows = [
-            {"team": t, "wins": v["wins"], "gf": v["gf"], "played": v["played"]}
-            for t, v in cum.items()
-        ]
-        top_rows = sorted(
-            all_rows,
-            key=lambda d: (d[metric_key], d["gf"], d["wins"], -d["played"]),
-            reverse=True
-        )[:top]
-        items.append({"year": year_val, "top": top_rows})
 
-    current_year = None
-    for r in rows:
-        y = int(r["year"])
-        if current_year is None:
-            current_year = y
-        # If we’re moving to a new year, snapshot the previous one
-        if y != current_year:
-            snapshot(current_year)
-            current_year = y
-        # Update cumulative totals with this team's year contribution
-        c = cum[r["team"]]
-        c["wins"]   += int(r["wins"] or 0)
-        c["gf"]     += int(r["gf"] or 0)
-        c["played"] += int(r["played"] or 0)
-
-    # Final snapshot for the last processed year
-    if current_year is not None:
-        snapshot(current_year)
+#http://127.0.0.1:8000/stats/ratings?top=20&active_since=2020-01-01
+#http://127.0.0.1:8000/stats/ratings?as_of=1990-12-31&top=10
 
-    return {"metric": metric_key, "top": top, "items": items}
+@app.get("/stats/ratings")
+@fast_json("items")
+@cached
+def stats_ratings(
+    as_of: Optional[str] = None,          # 'YYYY-MM-DD'; default: after the latest match
+    top: int = Query(50, ge=1, le=500),
+    min_matches: int = Query(1, ge=1),
+    active_since: Optional[str] = None,   # 'YYYY-MM-DD'; drop teams with no match since
+    db: Session = Depends(get_db),
+):
+    """Elo ranking (see ratings.py): each team's rating after its last match up to as_of."""
+    items = ratings.ranking(db, as_of, min_matches, active_since)
+    return {"as_of": as_of, "teams": len(items), "items": items[:top]}
+
+
+#http://127.0.0.1:8000/stats/ratings/timeline?team=Brazil&date_from=2010-01-01
+
+@app.get("/stats/ratings/timeline")
+@fast_json("items")
+@cached
+def stats_ratings_timeline(
+    team: str,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """One team's Elo rating after each of its matches."""
+    return {"team": team, "items": ratings.timeline(db, team, date_from, date_to)}
+
+@async_router.get("/stats/ratings/timeline")
+@fast_json("items")
+@cached
+async def stats_ratings_timeline_async(
+    team: str,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    dims = await async_dictionary()
+    rows = await db.execute(ratings.timeline_query(dims, team, date_from, date_to))
+    return {"team": team, "items": ratings.timeline_items(dims, rows)}
+
+
+def _form_body(team, as_of, items, streaks) -> dict:
+    return {
+        "team": team,
+        "as_of": as_of,
+        "form": "".join(m["result"] for m in items),
+        "points": sum(form.POINTS[m["result"]] for m in items),
+        "gf": sum(m["gf"] for m in items),
+        "ga": sum(m["ga"] for m in items),
+        "streaks": streaks,
+        "items": items,
+    }
+
+#http://127.0.0.1:8000/stats/form?team=Brazil
+#http://127.0.0.1:8000/stats/form?team=Brazil&n=10&as_of=2014-07-08
+
+@app.get("/stats/form")
+@fast_json("items")
+@cached
+def stats_form(
+    team: str,
+    n: int = Query(5, ge=1, le=50),
+    as_of: Optional[str] = None,          # 'YYYY-MM-DD'; default: up to the latest match
+    db: Session = Depends(get_db),
+):
+    """
+    A team's last n matches (oldest first) with the form string and totals, plus its
+    all-time and current streaks (see form.py).
+    """
+    return _form_body(team, as_of, form.last_matches(db, team, n, as_of), form.team_streaks(db, team))
+
+@async_router.get("/stats/form")
+@fast_json("items")
+@cached
+async def stats_form_async(
+    team: str,
+    n: int = Query(5, ge=1, le=50),
+    as_of: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    dims = await async_dictionary()
+    rows = await db.execute(form.last_matches_query(dims, team, n, as_of))
+    items = form.last_matches_items(dims, rows.all())
+    streaks = form.team_streaks_items(await db.execute(form.team_streaks_query(dims, team)))
+    return _form_body(team, as_of, items, streaks)
+
+
+#http://127.0.0.1:8000/stats/rolling?team=Brazil&window=10&date_from=2000-01-01
+#http://127.0.0.1:8000/stats/rolling?team=Germany&window=5&tournament=FIFA%20World%20Cup
+
+@app.get("/stats/rolling")
+@fast_json("items")
+@cached
+def stats_rolling(
+    team: str,
+    window: int = Query(10, ge=1, le=100),
+    tournament: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Per match: goals for/against averages and points per game over the team's last
+    `window` matches (SQL window functions). Matches before date_from still count
+    towards the first windows.
+    """
+    return {"team": team, "window": window,
+            "items": form.rolling(db, team, window, tournament, date_from, date_to)}
+
+@async_router.get("/stats/rolling")
+@fast_json("items")
+@cached
+async def stats_rolling_async(
+    team: str,
+    window: int = Query(10, ge=1, le=100),
+    tournament: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    dims = await async_dictionary()
+    rows = await db.execute(form.rolling_query(dims, team, window, tournament, date_from, date_to))
+    return {"team": team, "window": window, "items": form.rolling_items(dims, rows)}
+
+
+#http://127.0.0.1:8000/stats/streaks?kind=unbeaten
+#http://127.0.0.1:8000/stats/streaks?kind=winning&by=current&top=10
+
+@app.get("/stats/streaks")
+@fast_json("items")
+@cached
+def stats_streaks(
+    kind: str = Query("winning", pattern="^(%s)$" % "|".join(form.STREAK_KINDS)),
+    by: str = Query("longest", pattern="^(longest|current)$"),
+    top: int = Query(20, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """Streak leaderboard from the team_streaks table built at ingest."""
+    return {"kind": kind, "by": by, "items": form.streak_leaders(db, kind, by, top)}
+
+@async_router.get("/stats/streaks")
+@fast_json("items")
+@cached
+async def stats_streaks_async(
+    kind: str = Query("winning", pattern="^(%s)$" % "|".join(form.STREAK_KINDS)),
+    by: str = Query("longest", pattern="^(longest|current)$"),
+    top: int = Query(20, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+):
+    rows = await db.execute(form.streak_leaders_query(kind, by, top))
+    return {"kind": kind, "by": by, "items": form.streak_leaders_items(rows)}
+
+
+#http://127.0.0.1:8000/meta/teams
+#http://127.0.0.1:8000/meta/teams?min_matches=500
+
+@app.get("/meta/teams")
+@fast_json()
+def list_teams(min_matches: int = Query(1, ge=0), db: Session = Depends(get_db)):
+    """Team dictionary (id, name, matches, first/last match date) by name, from memory."""
+    return [t for t in dimensions.get_dictionary(db).teams if t["matches"] >= min_matches]
+
+@async_router.get("/meta/teams")
+@fast_json()
+async def list_teams_async(min_matches: int = Query(1, ge=0)):
+    return [t for t in (await async_dictionary()).teams if t["matches"] >= min_matches]
+
+
+#http://127.0.0.1:8000/meta/teams/search?q=united
+#http://127.0.0.1:8000/meta/teams/search?q=cote&limit=5
+
+@app.get("/meta/teams/search")
+@fast_json()
+def search_teams(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+):
+    """
+    Autocomplete: teams with a word of their name (or of a former name) starting with q,
+    case- and accent-insensitive, most matches first. Served from memory (see team_search.py).
+    """
+    return {"q": q, "items": dimensions.get_dictionary(db).search_index.search(q, limit)}
 
+@async_router.get("/meta/teams/search")
+@fast_json()
+async def search_teams_async(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=50),
+):
+    return {"q": q, "items": (await async_dictionary()).search_index.search(q, limit)}
+
+
+# Counted per tournament_id on its covering index, then joined to the names; grouping by
+# the matches.tournament name column would scan the table into a temp b-tree
+_tournament_counts = (
+    select(Match.tournament_id, func.count().label("matches"))
+      .group_by(Match.tournament_id)
+      .subquery()
+)
+TOURNAMENTS_QUERY = (
+    select(Tournament.name, _tournament_counts.c.matches)
+      .join(_tournament_counts, _tournament_counts.c.tournament_id == Tournament.id)
+      .order_by(_tournament_counts.c.matches.desc(), Tournament.name.asc())
+)
+
+def _tournament_items(rows):
+    return [{"name": t, "matches": int(n)} for (t, n) in rows]
 
 #http://127.0.0.1:8000/meta/tournaments
 
 @app.get("/meta/tournaments")
+@cached
 def list_tournaments(db: Session = Depends(get_db)):
-    rows = (
-        db.query(Match.tournament, func.count().label("matches"))
-          .group_by(Match.tournament)
-          .order_by(func.count().desc(), Match.tournament.asc())
-          .all()
-    )
-    return [{"name": t, "matches": int(n)} for (t, n) in rows]
\ No newline at end of file
+    return _tournament_items(db.execute(TOURNAMENTS_QUERY))
+
+@async_router.get("/meta/tournaments")
+@cached
+async def list_tournaments_async(db: AsyncSession = Depends(get_async_db)):
+    return _tournament_items(await db.execute(TOURNAMENTS_QUERY))
+
+
+#http://127.0.0.1:8000/meta/cache
+
+@app.get("/meta/cache")
+def cache_stats():
+    return response_cache.stats()
+
+
+#http://127.0.0.1:8000/meta/concurrency
+
+@app.get("/meta/concurrency")
+def concurrency_stats():
+    return coalesce.stats()
+
+
+# /async twins of the I/O-bound read endpoints (FOOTBALL_ASYNC_DB=1 and aiosqlite installed)
+if async_engine is not None:
+    app.include_router(async_router)
+
+
+# Per-request SQL/app/serialization timings: Server-Timing header + /metrics (FOOTBALL_METRICS=1).
+# Installed after the routes so every one of them, async mirror included, gets timed.
+if os.getenv("FOOTBALL_METRICS", "0") == "1":
+    from .instrumentation import install
+    install(app, engine, async_engine)
+
+
+# Admin-only request / whole-process profiler (FOOTBALL_PROFILING=1 + FOOTBALL_PROFILING_TOKEN).
+if os.getenv("FOOTBALL_PROFILING", "0") == "1":
+    from .profiler import install as install_profiler
+    install_profiler(app)
@@ -1,16 +1,153 @@
-from sqlalchemy import Column, Integer, String, Boolean
+from sqlalchemy import Column, Integer, String, Boolean, Float, Index, UniqueConstraint
 from .database import Base
 
+class Team(Base):
+    # Dimension table: one small integer id per team name, assigned at ingest (see dimensions.py)
+    __tablename__ = "teams"
+
+    id          = Column(Integer, primary_key=True)
+    name        = Column(String,  nullable=False, unique=True)
+    matches     = Column(Integer, nullable=False, server_default="0")   # refreshed on every ingest
+    first_match = Column(String(10))
+    last_match  = Column(String(10))
+
+
+class Tournament(Base):
+    __tablename__ = "tournaments"
+
+    id   = Column(Integer, primary_key=True)
+    name = Column(String,  nullable=False, unique=True)
+
+
+class Venue(Base):
+    # (city, country) pairs; missing values are stored as '' so the pair stays unique
+    __tablename__ = "venues"
+
+    id      = Column(Integer, primary_key=True)
+    city    = Column(String,  nullable=False)
+    country = Column(String,  nullable=False)
+
+    __table_args__ = (UniqueConstraint("city", "country", name="uq_venues_city_country"),)
+
+
 class Match(Base):
     __tablename__ = "matches"
 
     id         = Column(Integer, primary_key=True, index=True)
     date       = Column(String(10), nullable=False)   # 'YYYY-MM-DD'
-    home_team  = Column(String,    nullable=False, index=True)
-    away_team  = Column(String,    nullable=False, index=True)
+    date_key   = Column(Integer,   nullable=False)    # YYYYMMDD, see aggregates.date_key()
+    year       = Column(Integer,   nullable=False)
+    home_team  = Column(String,    nullable=False)
+    away_team  = Column(String,    nullable=False)
     home_score = Column(Integer,   nullable=False)
     away_score = Column(Integer,   nullable=False)
-    tournament = Column(String,    nullable=False, index=True)
+    tournament = Column(String,    nullable=False)
     city       = Column(String)
-    country    = Column(String, index=True)
+    country    = Column(String)
     neutral    = Column(Boolean,   nullable=False)    # stored as 0/1 in SQLite
+    # Dimension ids, filled at ingest; filters and group-bys use these, not the names
+    home_team_id  = Column(Integer)   # teams.id
+    away_team_id  = Column(Integer)   # teams.id
+    tournament_id = Column(Integer)   # tournaments.id
+    venue_id      = Column(Integer)   # venues.id
+
+    __table_args__ = (
+        # Keyset pagination: ORDER BY date, id / WHERE (date, id) > (:date, :id)
+        Index("ix_matches_date_id", "date", "id"),
+        # Year group-bys and date ranges on integer columns instead of substr(date, 1, 4)
+        Index("ix_matches_date_key", "date_key"),
+        Index("ix_matches_tournament_id_year", "tournament_id", "year", "date_key"),
+        Index("ix_matches_year_home_id", "year", "home_team_id"),
+        Index("ix_matches_year_away_id", "year", "away_team_id"),
+    )
+
+
+class TeamYearStat(Base):
+    # Materialized per-team/per-year/per-tournament totals, rebuilt by ingest_results.run()
+    __tablename__ = "team_year_stats"
+
+    team       = Column(String,  primary_key=True)
+    year       = Column(Integer, primary_key=True)
+    tournament = Column(String,  primary_key=True)
+    played     = Column(Integer, nullable=False)
+    wins       = Column(Integer, nullable=False)
+    draws      = Column(Integer, nullable=False)
+    losses     = Column(Integer, nullable=False)
+    gf         = Column(Integer, nullable=False)
+    ga         = Column(Integer, nullable=False)
+
+    # Both end in (year, team), the leaderboards' GROUP BY / ORDER BY, so SQLite reads
+    # the groups in index order instead of sorting them in a temp b-tree
+    __table_args__ = (
+        Index("ix_team_year_stats_year_team", "year", "team"),
+        Index("ix_team_year_stats_tournament_year_team", "tournament", "year", "team"),
+    )
+
+
+class IngestState(Base):
+    # Small key/value table for ingest bookkeeping (e.g. the results.csv high-water mark)
+    __tablename__ = "ingest_state"
+
+    key   = Column(String, primary_key=True)
+    value = Column(String, nullable=False)
+
+
+class TeamMatch(Base):
+    # One row per team per match (two per Match), from that team's perspective.
+    # Lets per-team queries be index range scans instead of home/away OR filters.
+    # Teams and tournaments are dimension ids (see dimensions.py).
+    __tablename__ = "team_matches"
+
+    match_id      = Column(Integer, primary_key=True)   # matches.id
+    team_id       = Column(Integer, primary_key=True)   # teams.id
+    opponent_id   = Column(Integer, nullable=False)     # teams.id
+    date          = Column(String(10), nullable=False)  # 'YYYY-MM-DD'
+    date_key      = Column(Integer, nullable=False)     # YYYYMMDD
+    year          = Column(Integer, nullable=False)
+    tournament_id = Column(Integer, nullable=False)     # tournaments.id
+    is_home       = Column(Boolean, nullable=False)
+    goals_for     = Column(Integer, nullable=False)
+    goals_against = Column(Integer, nullable=False)
+    result        = Column(String(1), nullable=False)   # 'W' / 'D' / 'L'
+
+    __table_args__ = (
+        Index("ix_team_matches_team_id_date", "team_id", "date", "match_id"),
+        Index("ix_team_matches_team_id_year", "team_id", "year", "date_key"),
+        Index("ix_team_matches_tournament_id_year", "tournament_id", "year", "date_key"),
+    )
+
+
+class TeamRating(Base):
+    # Elo rating checkpoint: a team's rating after each of its matches (two rows per Match),
+    # maintained by ratings.update_ratings() -- incrementally from the first changed date.
+    __tablename__ = "team_ratings"
+
+    match_id = Column(Integer, primary_key=True)     # matches.id
+    team     = Column(String,  primary_key=True)
+    date     = Column(String(10), nullable=False)    # 'YYYY-MM-DD'
+    rating   = Column(Float,   nullable=False)       # after the match
+    delta    = Column(Float,   nullable=False)       # change from this match
+    matches  = Column(Integer, nullable=False)       # rated matches so far, this one included
+
+    __table_args__ = (
+        Index("ix_team_ratings_team_date", "team", "date", "match_id"),
+        Index("ix_team_ratings_date", "date"),
+    )
+
+
+class TeamStreak(Base):
+    # Per team and streak kind (see form.STREAK_KINDS): the longest run ever and the
+    # run still going after the team's latest match. Rebuilt from team_matches at ingest.
+    __tablename__ = "team_streaks"
+
+    team_id    = Column(Integer, primary_key=True)      # teams.id
+    kind       = Column(String,  primary_key=True)      # 'winning', 'unbeaten', ...
+    longest    = Column(Integer, nullable=False)
+    start_date = Column(String(10))                     # of the longest run (first one on ties)
+    end_date   = Column(String(10))
+    current    = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_team_streaks_kind_longest", "kind", "longest"),
+        Index("ix_team_streaks_kind_current", "kind", "current"),
+    )
@@ -0,0 +1,363 @@
+# backend/app/profiler.py
+# Admin-only, opt-in profiling of single requests or of the whole process.
+#
+# Enable with FOOTBALL_PROFILING=1 and an admin token in FOOTBALL_PROFILING_TOKEN;
+# otherwise nothing here is installed and requests pay nothing for it.
+#
+# Per request: send X-Profile-Token plus either
+#   X-Profile: sample | cprofile        (or ?_profile=sample|cprofile)
+#   X-Profile-Format: speedscope | collapsed   (or ?_profile_format=...; default speedscope)
+# The endpoint runs as usual (response cache and If-None-Match bypassed) and the
+# body is replaced by the trace; X-Profiled-Status carries the original status.
+#   sample    a background thread samples the request's threads every
+#             FOOTBALL_PROFILING_INTERVAL_MS (default 1) -- low overhead, statistical
+#   cprofile  deterministic cProfile; call-graph times are split into stacks
+#             proportionally (as flameprof does), so deep stacks are approximate
+# The event-loop thread is shared, so concurrent requests' async work can show up too.
+#
+# Whole process: GET /admin/profile?seconds=10&interval_ms=5&format=speedscope
+# samples every thread for a bounded time and returns the same formats.
+#
+# speedscope files open at https://www.speedscope.app; collapsed stacks feed
+# flamegraph.pl / inferno. Weights are microseconds in both.
+import asyncio
+import cProfile
+import contextvars
+import functools
+import hmac
+import inspect
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi import Header, HTTPException, Query
+from starlette.responses import Response
+
+from .cache import bypass as cache_bypass
+
+PROFILING_TOKEN = os.getenv("FOOTBALL_PROFILING_TOKEN", "")
+REQUEST_INTERVAL = float(os.getenv("FOOTBALL_PROFILING_INTERVAL_MS", "1")) / 1000
+MAX_SECONDS = float(os.getenv("FOOTBALL_PROFILING_MAX_SECONDS", "60"))
+
+MODES = ("sample", "cprofile")
+FORMATS = ("speedscope", "collapsed")
+MAX_DEPTH = 128
+
+# Leaf frames of a thread that is just waiting (idle event loop, parked worker)
+_IDLE = {("select", "selectors.py"), ("poll", "selectors.py"),
+         ("wait", "threading.py"), ("get", "queue.py")}
+
+
+# ---------- stacks ----------
+
+def _frame_stack(frame) -> tuple:
+    """Root-first tuple of (function, file, line) for a live frame."""
+    out = []
+    while frame is not None:
+        code = frame.f_code
+        out.append((code.co_name, code.co_filename, code.co_firstlineno))
+        frame = frame.f_back
+    out.reverse()
+    return tuple(out)
+
+
+def _is_idle(stack) -> bool:
+    # Last Python frame (cProfile stacks may end in a builtin, file "~")
+    for name, filename, _ in reversed(stack):
+        if filename != "~":
+            return (name, os.path.basename(filename)) in _IDLE
+    return False
+
+
+class Sampler(threading.Thread):
+    """Samples the stacks of the given threads (None = every other thread) until stopped."""
+
+    def __init__(self, interval: float, thread_ids=None):
+        super().__init__(name="profiler-sampler", daemon=True)
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.stacks = defaultdict(Counter)   # thread name -> {stack: microseconds}
+        self.samples = 0
+        self._halt = threading.Event()
+
+    def run(self):
+        # A busy thread only hands over the GIL every switch interval (5ms by default),
+        # which would cap the sample rate; shorten it while sampling.
+        switch = sys.getswitchinterval()
+        sys.setswitchinterval(min(switch, self.interval))
+        try:
+            self._sample()
+        finally:
+            sys.setswitchinterval(switch)
+
+    def _sample(self):
+        last = time.perf_counter()
+        while not self._halt.wait(self.interval):
+            now = time.perf_counter()
+            weight, last = int((now - last) * 1e6), now
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == self.ident or (self.thread_ids is not None and ident not in self.thread_ids):
+                    continue
+                stack = _frame_stack(frame)
+                if not _is_idle(stack):
+                    self.stacks[names.get(ident, str(ident))][stack] += weight
+            self.samples += 1
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+
+def cprofile_stacks(profile: cProfile.Profile) -> Counter:
+    """Expand cProfile's caller/callee graph into {stack: microseconds of self time}."""
+    stats = pstats.Stats(profile).stats   # (file, line, name) -> (cc, nc, tt, ct, callers)
+    callees = defaultdict(dict)
+    for fn, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees[caller][fn] = edge[3]
+    out = Counter()
+
+    def visit(fn, stack, weight):
+        _, _, tt, ct, _ = stats[fn]
+        ratio = weight / ct if ct else 0.0
+        stack = stack + ((fn[2], fn[0], fn[1]),)
+        self_us = int(tt * ratio * 1e6)
+        if self_us and not _is_idle(stack):
+            out[stack] += self_us
+        if len(stack) >= MAX_DEPTH:
+            return
+        for callee, edge_ct in callees[fn].items():
+            child = edge_ct * ratio
+            # skip recursion and sub-microsecond branches
+            if child >= 1e-6 and (callee[2], callee[0], callee[1]) not in stack:
+                visit(callee, stack, child)
+
+    for fn, (_, _, _, ct, callers) in stats.items():
+        if not callers:
+            visit(fn, (), ct)
+    return out
+
+
+# ---------- output formats ----------
+
+def _short(filename: str) -> str:
+    parts = filename.replace("\\", "/").split("/")
+    return "/".join(parts[-2:])
+
+
+def _label(frame) -> str:
+    name, filename, line = frame
+    return f"{name} ({_short(filename)}:{line})" if filename != "~" else name
+
+
+def to_collapsed(profiles: dict) -> str:
+    """Brendan Gregg's folded format: thread;frame;frame weight"""
+    lines = []
+    for thread, stacks in profiles.items():
+        for stack, weight in stacks.most_common():
+            lines.append(";".join([thread] + [_label(f) for f in stack]) + f" {weight}")
+    return "\n".join(lines) + "\n"
+
+
+def to_speedscope(profiles: dict, name: str) -> dict:
+    """speedscope file format: one sampled profile per thread, weights in microseconds."""
+    frames, index = [], {}
+    out = []
+    for thread, stacks in profiles.items():
+        samples, weights = [], []
+        for stack, weight in stacks.most_common():
+            ids = []
+            for f in stack:
+                i = index.get(f)
+                if i is None:
+                    i = index[f] = len(frames)
+                    frames.append({"name": f[0], "file": f[1], "line": f[2]})
+                ids.append(i)
+            samples.append(ids)
+            weights.append(weight)
+        out.append({"type": "sampled", "name": thread, "unit": "microseconds",
+                    "startValue": 0, "endValue": sum(weights),
+                    "samples": samples, "weights": weights})
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "football-api",
+        "shared": {"frames": frames},
+        "profiles": out,
+    }
+
+
+def render(profiles: dict, fmt: str, name: str, headers: dict) -> Response:
+    slug = "".join(c if c.isalnum() else "_" for c in name).strip("_") or "profile"
+    if fmt == "collapsed":
+        body, media, ext = to_collapsed(profiles), "text/plain; charset=utf-8", "folded.txt"
+    else:
+        body = json.dumps(to_speedscope(profiles, name), separators=(",", ":"))
+        media, ext = "application/json", "speedscope.json"
+    headers = dict(headers, **{"Content-Disposition": f'attachment; filename="{slug}.{ext}"'})
+    return Response(body, media_type=media, headers=headers)
+
+
+def _authorized(token) -> bool:
+    return bool(token) and hmac.compare_digest(token.encode(), PROFILING_TOKEN.encode())
+
+
+# ---------- per-request profiling ----------
+
+class _RequestProfile:
+    def __init__(self, mode):
+        self.mode = mode
+        self.thread_ids = {threading.get_ident()}
+        self.profiles = []   # [(thread name, cProfile.Profile)]
+
+
+_active = contextvars.ContextVar("request_profile", default=None)
+_busy = threading.Lock()   # cProfile and the sampler each handle one traced request at a time
+
+
+def _traced(fn):
+    """Endpoint wrapper: registers the worker thread a sync endpoint runs in (and profiles it)."""
+    if inspect.iscoroutinefunction(fn):
+        return fn   # runs on the event-loop thread, already covered by the middleware
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        rp = _active.get()
+        if rp is None:
+            return fn(*args, **kwargs)
+        rp.thread_ids.add(threading.get_ident())
+        if rp.mode != "cprofile":
+            return fn(*args, **kwargs)
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.disable()
+            rp.profiles.append((threading.current_thread().name, profile))
+    return wrapper
+
+
+def _request_options(scope):
+    """(mode, format, token, scope without the profiling params) or None if not requested."""
+    headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+    query = parse_qsl(scope["query_string"].decode("latin-1"), keep_blank_values=True)
+    params = dict(query)
+    mode = params.get("_profile") or headers.get("x-profile")
+    if not mode:
+        return None
+    fmt = params.get("_profile_format") or headers.get("x-profile-format") or "speedscope"
+    # The app sees the request without the profiling params / conditional headers
+    scope = dict(
+        scope,
+        query_string=urlencode([(k, v) for k, v in query if not k.startswith("_profile")]).encode(),
+        headers=[(k, v) for k, v in scope["headers"] if k not in (b"if-none-match",)],
+    )
+    return mode, fmt, headers.get("x-profile-token"), scope
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        opts = _request_options(scope) if scope["type"] == "http" else None
+        if opts is None:
+            return await self.app(scope, receive, send)
+
+        mode, fmt, token, scope = opts
+        if not _authorized(token):
+            return await Response("profiling requires a valid X-Profile-Token", 403)(scope, receive, send)
+        if mode not in MODES or fmt not in FORMATS:
+            return await Response(f"profile mode must be one of {MODES}, format one of {FORMATS}",
+                                  400)(scope, receive, send)
+        if not _busy.acquire(blocking=False):
+            return await Response("profiler busy", 409)(scope, receive, send)
+
+        status = None
+
+        async def discard(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+
+        rp = _RequestProfile(mode)
+        token_rp, token_cache = _active.set(rp), cache_bypass.set(True)
+        try:
+            t0 = time.perf_counter()
+            if mode == "cprofile":
+                loop_profile = cProfile.Profile()
+                loop_profile.enable()
+                try:
+                    await self.app(scope, receive, discard)
+                finally:
+                    loop_profile.disable()
+                rp.profiles.append((threading.current_thread().name, loop_profile))
+                profiles = defaultdict(Counter)
+                for thread, profile in rp.profiles:
+                    profiles[thread].update(cprofile_stacks(profile))
+            else:
+                sampler = Sampler(REQUEST_INTERVAL, rp.thread_ids)
+                sampler.start()
+                try:
+                    await self.app(scope, receive, discard)
+                finally:
+                    sampler.stop()
+                profiles = sampler.stacks
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+        finally:
+            _active.reset(token_rp)
+            cache_bypass.reset(token_cache)
+            _busy.release()
+
+        name = f"{mode} GET {scope['path']}"
+        headers = {"X-Profiled-Status": str(status), "X-Profile-Duration-Ms": f"{elapsed_ms:.2f}",
+                   "Cache-Control": "no-store"}
+        await render(profiles, fmt, name, headers)(scope, receive, send)
+
+
+# ---------- whole-process sampling ----------
+
+_process_lock = asyncio.Lock()
+
+
+async def profile_process(
+    seconds: float = Query(10, gt=0),
+    interval_ms: float = Query(5, ge=0.5, le=1000),
+    format: str = Query("speedscope", pattern="^(speedscope|collapsed)$"),
+    x_profile_token: str | None = Header(None),
+):
+    """Sample every thread of this process for `seconds` (capped at FOOTBALL_PROFILING_MAX_SECONDS)."""
+    if not _authorized(x_profile_token):
+        raise HTTPException(status_code=403, detail="profiling requires a valid X-Profile-Token")
+    if _process_lock.locked():
+        raise HTTPException(status_code=409, detail="profiler busy")
+    seconds = min(seconds, MAX_SECONDS)
+    async with _process_lock:
+        sampler = Sampler(interval_ms / 1000)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+    headers = {"X-Profile-Samples": str(sampler.samples), "Cache-Control": "no-store"}
+    return render(sampler.stacks, format, f"process {os.getpid()} {seconds:g}s", headers)
+
+
+def install(app, path: str = "/admin/profile"):
+    """Add the per-request middleware and the whole-process endpoint (call after all routes)."""
+    if not PROFILING_TOKEN:
+        print("FOOTBALL_PROFILING=1 but FOOTBALL_PROFILING_TOKEN is empty; profiling disabled.")
+        return
+    for route in app.router.routes:
+        dependant = getattr(route, "dependant", None)
+        if dependant is not None and dependant.call is not None:
+            dependant.call = _traced(dependant.call)
+    app.add_api_route(path, profile_process, methods=["GET"], include_in_schema=False)
+    app.add_middleware(ProfilingMiddleware)
@@ -0,0 +1,179 @@
+# backend/app/ratings.py
+# Elo ratings over the match history (World Football Elo rules), stored in team_ratings.
+#
+# Matches are replayed in one streaming pass in (date, id) order. Per-team state is
+# a pair of flat arrays indexed by a team slot, so a full rebuild is one tight loop
+# plus chunked bulk inserts. After an incremental ingest only the matches from the
+# first changed date onwards are replayed: their rows are dropped and the state is
+# restored from each team's last checkpoint before that date.
+from array import array
+from typing import Optional
+
+from sqlalchemy import and_, func, select, text
+from sqlalchemy.orm import Session
+
+from .dimensions import Dictionary, get_dictionary
+from .models import TeamMatch, TeamRating
+
+INITIAL_RATING = 1500.0
+HOME_ADVANTAGE = 100.0     # added to the home side's rating unless the venue is neutral
+CHUNK = 10000              # rows per streamed read / bulk insert
+
+# Column order for the insert tuples
+INSERT_COLUMNS = ("match_id", "team", "date", "rating", "delta", "matches")
+
+CONTINENTAL = {
+    "UEFA Euro", "Copa América", "African Cup of Nations", "AFC Asian Cup", "Gold Cup",
+    "CONCACAF Championship", "Oceania Nations Cup", "Confederations Cup",
+}
+
+
+def k_factor(tournament: str) -> int:
+    """Weight of a match by its importance."""
+    if tournament == "FIFA World Cup":
+        return 60
+    if tournament in CONTINENTAL:
+        return 50
+    if "qualification" in tournament or tournament.endswith("Nations League"):
+        return 40
+    if tournament == "Friendly":
+        return 20
+    return 30
+
+
+class RatingState:
+    """Current rating and rated-match count per team, in flat arrays indexed by slot."""
+
+    def __init__(self):
+        self.slots = {}
+        self.rating = array("d")
+        self.matches = array("l")
+
+    def slot(self, team: str) -> int:
+        s = self.slots.get(team)
+        if s is None:
+            s = self.slots[team] = len(self.rating)
+            self.rating.append(INITIAL_RATING)
+            self.matches.append(0)
+        return s
+
+    def restore(self, team: str, rating: float, matches: int):
+        s = self.slot(team)
+        self.rating[s], self.matches[s] = rating, matches
+
+
+def _latest(db: Session, before: Optional[str] = None, through: Optional[str] = None):
+    """Each team's last checkpoint (date < before / date <= through): {team: row}."""
+    last = db.query(TeamRating.team.label("team"), func.max(TeamRating.date).label("date"))
+    if before:
+        last = last.filter(TeamRating.date < before)
+    if through:
+        last = last.filter(TeamRating.date <= through)
+    last = last.group_by(TeamRating.team).subquery()
+    rows = (db.query(TeamRating.team, TeamRating.date, TeamRating.rating, TeamRating.matches)
+              .join(last, and_(TeamRating.team == last.c.team, TeamRating.date == last.c.date))
+              .order_by(TeamRating.match_id.asc()))
+    # Two matches on one day: the later one (higher id, replayed last) wins
+    return {r.team: r for r in rows}
+
+
+def update_ratings(db: Session, since: Optional[str] = None) -> int:
+    """
+    Replay matches from `since` ('YYYY-MM-DD'; None = the whole history) into
+    team_ratings, inside the caller's transaction. Returns the number of rows written.
+    """
+    state = RatingState()
+    if since is None:
+        # No WHERE so SQLite can use its truncate fast path
+        db.execute(text("DELETE FROM team_ratings"))
+    else:
+        db.query(TeamRating).filter(TeamRating.date >= since).delete(synchronize_session=False)
+        for team, r in _latest(db, before=since).items():
+            state.restore(team, r.rating, r.matches)
+
+    # Plain tuples both ways through the DBAPI -- no per-row ORM bookkeeping
+    conn = db.connection()
+    mark = "?" if conn.dialect.paramstyle == "qmark" else "%s"
+    insert_sql = "INSERT INTO team_ratings (%s) VALUES (%s)" % (
+        ", ".join(INSERT_COLUMNS), ", ".join([mark] * len(INSERT_COLUMNS)))
+    rows = conn.exec_driver_sql(
+        "SELECT id, date, home_team, away_team, home_score, away_score, tournament, neutral "
+        "FROM matches %s ORDER BY date, id" % (f"WHERE date >= {mark}" if since is not None else ""),
+        (since,) if since is not None else ())
+
+    # Hot loop, once per match: K is looked up per tournament, and the goal-difference
+    # multiplier (1 up to one goal, 1.5 for two, (11 + diff) / 8 beyond) is inline
+    slots, slot = state.slots, state.slot
+    rating, played = state.rating, state.matches
+    k_of = {}
+    batch, written = [], 0
+    for mid, date, home, away, hs, as_, tournament, neutral in rows:
+        h = slots.get(home)
+        if h is None:
+            h = slot(home)
+        a = slots.get(away)
+        if a is None:
+            a = slot(away)
+        k = k_of.get(tournament)
+        if k is None:
+            k = k_of[tournament] = k_factor(tournament)
+        dr = rating[h] - rating[a] + (0.0 if neutral else HOME_ADVANTAGE)
+        expected = 1.0 / (10 ** (-dr / 400) + 1)
+        if hs > as_:
+            result, diff = 1.0, hs - as_
+        elif hs < as_:
+            result, diff = 0.0, as_ - hs
+        else:
+            result, diff = 0.5, 0
+        change = k * (1.0 if diff <= 1 else 1.5 if diff == 2 else (11 + diff) / 8) * (result - expected)
+        rating[h] += change
+        rating[a] -= change
+        played[h] += 1
+        played[a] += 1
+        batch.append((mid, home, date, rating[h], change, played[h]))
+        batch.append((mid, away, date, rating[a], -change, played[a]))
+        if len(batch) >= CHUNK:
+            conn.exec_driver_sql(insert_sql, batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        conn.exec_driver_sql(insert_sql, batch)
+        written += len(batch)
+    return written
+
+
+def ranking(db: Session, as_of: Optional[str], min_matches: int, active_since: Optional[str]):
+    """Teams by rating as of `as_of` (None = now), strongest first."""
+    rows = [r for r in _latest(db, through=as_of).values()
+            if r.matches >= min_matches and (not active_since or r.date >= active_since)]
+    rows.sort(key=lambda r: (-r.rating, r.team))
+    return [{"rank": i, "team": r.team, "rating": round(r.rating, 1),
+             "matches": r.matches, "last_match": r.date}
+            for i, r in enumerate(rows, 1)]
+
+
+def timeline_query(dims: Dictionary, team: str, date_from: Optional[str], date_to: Optional[str]):
+    """One team's rating after each of its matches, oldest first."""
+    q = (select(TeamRating.date, TeamMatch.opponent_id, TeamMatch.tournament_id,
+                TeamMatch.goals_for, TeamMatch.goals_against, TeamRating.rating, TeamRating.delta)
+           .join(TeamMatch, and_(TeamMatch.match_id == TeamRating.match_id,
+                                 TeamMatch.team_id == dims.team_id(team)))
+           .filter(TeamRating.team == team))
+    if date_from:
+        q = q.filter(TeamRating.date >= date_from)
+    if date_to:
+        q = q.filter(TeamRating.date <= date_to)
+    return q.order_by(TeamRating.date.asc(), TeamRating.match_id.asc())
+
+
+def timeline_items(dims: Dictionary, rows):
+    return [{"date": r.date, "opponent": dims.team_names[r.opponent_id],
+             "tournament": dims.tournament_names[r.tournament_id],
+             "gf": r.goals_for, "ga": r.goals_against,
+             "rating": round(r.rating, 1), "delta": round(r.delta, 1)}
+            for r in rows]
+
+
+def timeline(db: Session, team: str, date_from: Optional[str], date_to: Optional[str]):
+    dims = get_dictionary(db)
+    return timeline_items(dims, db.execute(timeline_query(dims, team, date_from, date_to)))
@@ -0,0 +1,202 @@
+# backend/app/responses.py
+# Faster response path for the large JSON endpoints.
+#
+#   FastJSONResponse  orjson when installed (stdlib json otherwise); the app's default class
+#   @fast_json(...)   endpoint returns go straight to FastJSONResponse, skipping FastAPI's
+#                     jsonable_encoder walk, and gain ?shape=columns: row lists become
+#                     parallel arrays ({"team": [...], "wins": [...]}) -- smaller and faster
+#   CompressionMiddleware  br (optional `brotli` package) or gzip above a size threshold
+#
+# Env knobs:
+#   FOOTBALL_COMPRESSION=0              disable compression
+#   FOOTBALL_COMPRESS_MIN_BYTES=1024    smaller bodies are sent as is
+#   FOOTBALL_GZIP_LEVEL=6
+#   FOOTBALL_BROTLI_QUALITY=4           brotli's fast range; 11 is far slower per request
+import functools
+import inspect
+import json
+import os
+import zlib
+
+from fastapi import Query
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; stdlib json is used instead
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip only
+    brotli = None
+
+COMPRESSION_ENABLED = os.getenv("FOOTBALL_COMPRESSION", "1") != "0"
+COMPRESS_MIN_BYTES = int(os.getenv("FOOTBALL_COMPRESS_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("FOOTBALL_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("FOOTBALL_BROTLI_QUALITY", "4"))
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        # Same output settings as starlette's JSONResponse
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None,
+                          separators=(",", ":")).encode("utf-8")
+
+
+# ---------- columnar shape ----------
+
+def to_columns(rows):
+    """[{a: 1, b: [..]}, {a: 2, b: [..]}] -> {a: [1, 2], b: [columns, columns]}; other values unchanged."""
+    if not rows or not isinstance(rows, list) or not isinstance(rows[0], dict):
+        return rows
+    out = {}
+    for key, sample in rows[0].items():
+        if isinstance(sample, list):
+            out[key] = [to_columns(r[key]) for r in rows]
+        elif isinstance(sample, dict):
+            # e.g. the leaderboard's {metric: [rows]} per year
+            out[key] = [{k: to_columns(v) for k, v in r[key].items()} for r in rows]
+        else:
+            out[key] = [r[key] for r in rows]
+    return out
+
+
+def fast_json(*column_keys):
+    """
+    Endpoint decorator (outermost, above @cached): wraps the return value in a
+    FastJSONResponse. With `column_keys` it also adds a `shape` query parameter;
+    shape=columns converts the row lists under those keys with to_columns().
+    """
+    def decorate(fn):
+        sig = inspect.signature(fn)
+        shape_param = inspect.Parameter("shape", inspect.Parameter.KEYWORD_ONLY,
+                                        default=Query("rows", pattern="^(rows|columns)$"))
+
+        def respond(value, shape="rows"):
+            if isinstance(value, Response):
+                return value
+            if shape == "columns":
+                value = dict(value, **{k: to_columns(value[k]) for k in column_keys if k in value})
+            return FastJSONResponse(value)
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def wrapper(shape: str = "rows", **kwargs):
+                return respond(await fn(**kwargs), shape)
+        else:
+            @functools.wraps(fn)
+            def wrapper(shape: str = "rows", **kwargs):
+                return respond(fn(**kwargs), shape)
+
+        # `shape` only becomes a query parameter when there are row lists to convert
+        wrapper.__signature__ = (sig.replace(parameters=[*sig.parameters.values(), shape_param])
+                                 if column_keys else sig)
+        return wrapper
+    return decorate
+
+
+# ---------- compression ----------
+
+def _pick_encoding(accept_encoding: str):
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+class _Compressor:
+    def __init__(self, encoding):
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.process, self.finish = self._c.process, self._c.finish
+        else:
+            self._c = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.process, self.finish = self._c.compress, self._c.flush
+
+
+class CompressionMiddleware:
+    """
+    Compress JSON/NDJSON/text bodies with br or gzip (Accept-Encoding order of preference:
+    br, then gzip). Bodies under minimum_size are left alone; multi-part and streamed
+    bodies (e.g. /matches/export) are compressed on the fly.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        encoding = _pick_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            return await self.app(scope, receive, send)
+
+        start = None
+        compressor = None
+
+        async def send_wrapper(message):
+            nonlocal start, compressor
+            if message["type"] == "http.response.start":
+                start = message   # held until we see the first body chunk
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            body, more = message.get("body", b""), message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(scope=start)
+                ctype = headers.get("content-type", "")
+                # Content-Length when known (bodies relayed by @app.middleware arrive in pieces),
+                # else a streamed body is assumed to be large
+                length = headers.get("content-length")
+                large = int(length) >= self.minimum_size if length else (more or len(body) >= self.minimum_size)
+                eligible = (start["status"] == 200
+                            and "content-encoding" not in headers
+                            and ctype.startswith(COMPRESSIBLE_TYPES)
+                            and large)
+                if eligible:
+                    compressor = _Compressor(encoding)
+                    headers["Content-Encoding"] = encoding
+                    headers.add_vary_header("Accept-Encoding")
+                    # A different byte representation: keep the ETag, but only as a weak validator
+                    etag = headers.get("etag")
+                    if etag and not etag.startswith("W/"):
+                        headers["ETag"] = "W/" + etag
+                    if "content-length" in headers:
+                        del headers["content-length"]
+                    if not more:
+                        body = compressor.process(body) + compressor.finish()
+                        headers["Content-Length"] = str(len(body))
+                        compressor = None
+                        message = dict(message, body=body)
+                await send(start)
+                start = None
+                if compressor is None:
+                    return await send(message)
+
+            if compressor is not None:
+                chunk = compressor.process(body)
+                if not more:
+                    chunk += compressor.finish()
+                message = dict(message, body=chunk)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
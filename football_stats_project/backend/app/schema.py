@@ -0,0 +1,72 @@
+# backend/app/schema.py
+# Brings an existing database up to the current models. Shared by the API startup hook
+# and ingest_results.run(), so either can be the first to open a database built by an
+# older release. Every step checks before it changes anything; running it again is a no-op.
+#
+# create_all only creates missing tables, so columns added to `matches` since the first
+# release are added here with ALTER TABLE (and backfilled where they derive from `date`).
+# backfill_derived() then fills the dimension ids and any derived table that is still
+# empty; a full reload rebuilds all of those anyway and only needs migrate_schema().
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from . import aggregates, dimensions, form, ratings
+from .database import Base, engine
+from .models import Match, TeamMatch, TeamRating, TeamStreak, TeamYearStat
+
+# Columns added to matches after the first release: column -> backfill expression
+# (None: filled by dimensions.intern_dimensions)
+ADDED_COLUMNS = {
+    "date_key": "CAST(replace(date, '-', '') AS INTEGER)",
+    "year": "CAST(substr(date, 1, 4) AS INTEGER)",
+    "home_team_id": None,
+    "away_team_id": None,
+    "tournament_id": None,
+    "venue_id": None,
+}
+# Indexes replaced since: name columns on matches (by the dimension ids) and the
+# team_year_stats ones that didn't cover the leaderboards' (year, team) grouping
+DROPPED_INDEXES = ("ix_matches_home_team", "ix_matches_away_team", "ix_matches_tournament",
+                   "ix_matches_country", "ix_matches_tournament_year",
+                   "ix_matches_year_home", "ix_matches_year_away",
+                   "ix_team_year_stats_year_tournament", "ix_team_year_stats_tournament_year")
+
+
+def migrate_schema(db: Session):
+    """Create missing tables, add missing matches columns and (re)create indexes; commits."""
+    Base.metadata.create_all(bind=engine)
+    inspector = inspect(engine)
+    have = {c["name"] for c in inspector.get_columns("matches")}
+    for column, expr in ADDED_COLUMNS.items():
+        if column not in have:
+            db.execute(text(f"ALTER TABLE matches ADD COLUMN {column} INTEGER"))
+            if expr:
+                db.execute(text(f"UPDATE matches SET {column} = {expr}"))
+    for name in DROPPED_INDEXES:
+        db.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    # team_matches is derived: one keyed by names is dropped and rebuilt with ids
+    if "team_id" not in {c["name"] for c in inspector.get_columns("team_matches")}:
+        db.execute(text("DROP TABLE team_matches"))
+    db.commit()
+    Base.metadata.create_all(bind=engine)
+    for table in (Match, TeamMatch, TeamYearStat):
+        for ix in table.__table__.indexes:
+            ix.create(bind=engine, checkfirst=True)
+
+
+def backfill_derived(db: Session):
+    """Intern missing dimension ids and build derived tables that don't exist yet; commits."""
+    if db.query(Match).first() is None:
+        return
+    if db.query(Match).filter(Match.home_team_id.is_(None)).first() is not None:
+        dimensions.intern_dimensions(db)
+    if db.query(TeamYearStat).first() is None:
+        aggregates.rebuild_team_year_stats(db)
+    if db.query(TeamMatch).first() is None:
+        aggregates.rebuild_team_matches(db)
+        dimensions.refresh_team_stats(db)
+    if db.query(TeamRating).first() is None:
+        ratings.update_ratings(db)
+    if db.query(TeamStreak).first() is None:
+        form.rebuild_team_streaks(db)
+    db.commit()
@@ -0,0 +1,108 @@
+# backend/app/team_search.py
+# In-memory prefix index for team-name autocomplete (/meta/teams/search).
+#
+# Every team name, and every former name of a team, is normalized (case- and
+# diacritic-insensitive, punctuation as spaces) and indexed under the full string
+# and under each later word, so "sta", "united st" and "cote d" all hit. Keys live in
+# one sorted list; a query is a bisect plus a scan over the keys sharing its prefix.
+# The index hangs off the dimensions Dictionary, so it is rebuilt once per dataset
+# version and a lookup never touches SQLite.
+#
+# Former names: the built-in FORMER_NAMES below, plus data/former_names.csv when
+# present (the results dataset's companion file: current,former[,start_date,end_date]).
+import bisect
+import csv
+import os
+import unicodedata
+
+FORMER_NAMES_CSV = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "former_names.csv"))
+
+# former name -> name used in results.csv
+FORMER_NAMES = {
+    "Zaire": "DR Congo",
+    "Congo-Kinshasa": "DR Congo",
+    "Dahomey": "Benin",
+    "Upper Volta": "Burkina Faso",
+    "Burma": "Myanmar",
+    "Swaziland": "Eswatini",
+    "Macedonia": "North Macedonia",
+    "FYR Macedonia": "North Macedonia",
+    "West Germany": "Germany",
+    "Türkiye": "Turkey",
+    "Côte d'Ivoire": "Ivory Coast",
+    "Netherlands Antilles": "Curaçao",
+    "Ceylon": "Sri Lanka",
+    "Dutch East Indies": "Indonesia",
+    "Gold Coast": "Ghana",
+    "Northern Rhodesia": "Zambia",
+    "Rhodesia": "Zimbabwe",
+    "Siam": "Thailand",
+    "Tanganyika": "Tanzania",
+    "Persia": "Iran",
+    "Kampuchea": "Cambodia",
+    "Khmer Republic": "Cambodia",
+    "Western Samoa": "Samoa",
+    "British Guiana": "Guyana",
+    "Dutch Guiana": "Suriname",
+    "Irish Free State": "Republic of Ireland",
+    "Eire": "Republic of Ireland",
+    "USA": "United States",
+    "Korea Republic": "South Korea",
+    "Korea DPR": "North Korea",
+    "Cabo Verde": "Cape Verde",
+    "Czechia": "Czech Republic",
+}
+
+
+def normalize(text: str) -> str:
+    """Casefolded, accents stripped, anything but letters/digits collapsed to single spaces."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    plain = "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+    return " ".join("".join(c if c.isalnum() else " " for c in plain).split())
+
+
+def load_former_names(path: str = FORMER_NAMES_CSV) -> dict:
+    names = dict(FORMER_NAMES)
+    if os.path.exists(path):
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row.get("current") and row.get("former"):
+                    names[row["former"]] = row["current"]
+    return names
+
+
+class TeamSearchIndex:
+    def __init__(self, teams, former_names=None):
+        # teams: [{id, name, matches, ...}] (the Dictionary's rows)
+        self.teams = [t for t in teams if t["matches"] > 0]
+        pos = {t["name"]: i for i, t in enumerate(self.teams)}
+        entries = set()
+        for i, t in enumerate(self.teams):
+            entries.update(self._keys(t["name"], i, t["name"]))
+        for former, current in (former_names if former_names is not None else load_former_names()).items():
+            if current in pos and former not in pos:
+                entries.update(self._keys(former, pos[current], former))
+        entries = sorted(entries)
+        self.keys = [e[0] for e in entries]
+        self.refs = [(e[1], e[2]) for e in entries]   # (team index, name as matched)
+
+    @staticmethod
+    def _keys(name, i, label):
+        words = normalize(name).split()
+        # Full name plus every later word, so a query can start at any word
+        return [(" ".join(words[k:]), i, label) for k in range(len(words))]
+
+    def search(self, q: str, limit: int = 10) -> list:
+        """Teams whose name (or a former name) has a word starting with `q`, most matches first."""
+        q = normalize(q)
+        if not q:
+            return []
+        found = {}   # team index -> name that matched (the team's own name wins)
+        i = bisect.bisect_left(self.keys, q)
+        while i < len(self.keys) and self.keys[i].startswith(q):
+            t, label = self.refs[i]
+            if found.get(t) != self.teams[t]["name"]:
+                found[t] = label
+            i += 1
+        best = sorted(found, key=lambda t: (-self.teams[t]["matches"], self.teams[t]["name"]))[:limit]
+        return [dict(self.teams[t], matched=found[t]) for t in best]